@@ -0,0 +1,206 @@
+"""Benchmark tool calls in approval mode under concurrent runs.
+
+Compares the legacy approval wrapper (a plain sync closure around every tool)
+with the current one, which keeps async tools async. The legacy wrapper runs
+twice: with the function schema copied from the tool, as the legacy code did,
+and with the sync schema pydantic-ai derives from the closure itself. For each
+variant it times the wrapper where pydantic-ai calls it, and reports how many
+calls ran on a worker thread and how many only returned a coroutine.
+
+Run with: python -m benchmarks.approval_tools [--runs N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import inspect
+import statistics
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from typing import Any
+
+from pydantic_ai import (
+    Agent,
+    ApprovalRequired,
+    DeferredToolResults,
+    FunctionToolset,
+    RunContext,
+    Tool,
+)
+from pydantic_ai._utils import is_async_callable
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agent_playbook.api import _tool_for_approval
+
+TOOL_SLEEP = 0.005
+
+# Per wrapper call: latency, whether it ran on a worker thread, and whether it
+# returned a coroutine instead of the tool's result
+_samples: list[tuple[float, bool, bool]] = []
+
+
+async def async_lookup(ctx: RunContext[None], key: str) -> str:
+    await asyncio.sleep(TOOL_SLEEP)
+    return key
+
+
+def sync_lookup(key: str) -> str:
+    time.sleep(TOOL_SLEEP)
+    return key
+
+
+def _record(start: float, coroutine: bool = False) -> None:
+    on_worker = threading.current_thread() is not threading.main_thread()
+    _samples.append((time.perf_counter() - start, on_worker, coroutine))
+
+
+def _instrument(tool: Tool[Any]) -> Tool[Any]:
+    """Time the approval wrapper of `tool` as pydantic-ai calls it."""
+    schema = tool.function_schema
+    wrapper = schema.function
+
+    if schema.is_async:
+
+        async def timed_async(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await wrapper(*args, **kwargs)
+            finally:
+                _record(start)
+
+        schema.function = timed_async
+    else:
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            result = wrapper(*args, **kwargs)
+            coroutine = inspect.iscoroutine(result)
+            if coroutine:
+                # Nothing awaits it, so the tool never runs, and the run would
+                # fail serializing it: count it and return nothing instead
+                result.close()
+                result = None
+            _record(start, coroutine)
+            return result
+
+        schema.function = timed
+    tool.function = schema.function
+    return tool
+
+
+def _reply(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    return ModelResponse(parts=[TextPart("done")])
+
+
+def _legacy_tool_for_approval(tool: Tool[Any]) -> Tool[Any]:
+    def wrap(fn: Callable[..., Any], takes_ctx: bool) -> Callable[..., Any]:
+        def decorator(ctx: RunContext[Any], **kwargs: Any) -> Any:
+            if not ctx.tool_call_approved:
+                raise ApprovalRequired
+            if takes_ctx:
+                return fn(ctx, **kwargs)
+            return fn(**kwargs)
+
+        return decorator
+
+    new_tool = replace(tool)
+    new_tool.function_schema = replace(new_tool.function_schema)
+    new_tool.function = wrap(new_tool.function, new_tool.takes_ctx)
+    new_tool.function_schema.function = new_tool.function
+    new_tool.takes_ctx = True
+    new_tool.function_schema.takes_ctx = True
+    return new_tool
+
+
+def _legacy_sync_schema_tool_for_approval(tool: Tool[Any]) -> Tool[Any]:
+    new_tool = _legacy_tool_for_approval(tool)
+    new_tool.function_schema.is_async = is_async_callable(new_tool.function)
+    return new_tool
+
+
+def _history(tool_name: str) -> list[ModelMessage]:
+    return [
+        ModelRequest(parts=[UserPromptPart("look it up")]),
+        ModelResponse(
+            parts=[
+                ToolCallPart(tool_name=tool_name, args={"key": "k"}, tool_call_id="c1")
+            ]
+        ),
+    ]
+
+
+async def _run_variant(
+    wrap_tool: Callable[[Tool[Any]], Tool[Any]],
+    tool: Tool[Any],
+    runs: int,
+    concurrency: int,
+) -> dict[str, float]:
+    agent = Agent(FunctionModel(_reply))
+    toolset: FunctionToolset[Any] = FunctionToolset()
+    toolset.add_tool(_instrument(wrap_tool(tool)))
+    semaphore = asyncio.Semaphore(concurrency)
+    history = _history(tool.name)
+    results = DeferredToolResults(approvals={"c1": True})
+
+    async def one_run() -> None:
+        async with semaphore:
+            result = await agent.run(
+                message_history=history, deferred_tool_results=results
+            )
+            assert isinstance(result.all_messages()[2].parts[0], ToolReturnPart)
+
+    _samples.clear()
+    start = time.perf_counter()
+    with agent.override(toolsets=[toolset]):
+        await asyncio.gather(*(one_run() for _ in range(runs)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _, _ in _samples)
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "worker_thread_calls": sum(on_worker for _, on_worker, _ in _samples),
+        "coroutine_calls": sum(coroutine for _, _, coroutine in _samples),
+        "runs_per_sec": runs / elapsed,
+    }
+
+
+async def main(runs: int, concurrency: int) -> None:
+    tools = [Tool(async_lookup), Tool(sync_lookup)]
+    variants = {
+        "before": _legacy_tool_for_approval,
+        "before, sync schema": _legacy_sync_schema_tool_for_approval,
+        "after": _tool_for_approval,
+    }
+
+    print(f"runs={runs} concurrency={concurrency} tool_sleep={TOOL_SLEEP * 1000}ms")
+    print(
+        f"{'tool':<14}{'variant':<21}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'thread calls':>14}{'coroutines':>12}{'runs/s':>10}"
+    )
+    for tool in tools:
+        for variant, wrap_tool in variants.items():
+            stats = await _run_variant(wrap_tool, tool, runs, concurrency)
+            print(
+                f"{tool.name:<14}{variant:<21}{stats['p50_ms']:>9.2f}"
+                f"{stats['p95_ms']:>9.2f}{stats['worker_thread_calls']:>14.0f}"
+                f"{stats['coroutine_calls']:>12.0f}{stats['runs_per_sec']:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.concurrency))
@@ -0,0 +1,283 @@
+"""Load-test /api/chat in-process at increasing concurrency.
+
+Drives the FastAPI app directly over ASGI (no sockets) with conversations
+against a pydantic-ai `FunctionModel` or `TestModel`. For 1, 10, 100 and 1000
+concurrent conversations it reports requests/sec, time-to-first-byte and
+memory per concurrent stream, plus the serialization cost of each stream
+event type. Results are saved as JSON; pass a previous file to --compare to
+spot regressions.
+
+Run with: python -m benchmarks.chat_load [--levels 1,10,100] [--compare FILE]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import time
+import timeit
+import tracemalloc
+from collections.abc import AsyncIterator, MutableMapping
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from pydantic import TypeAdapter
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models.function import AgentInfo, DeltaToolCalls, FunctionModel
+from pydantic_ai.models.test import TestModel
+
+from agent_playbook import export
+from agent_playbook.api import api_router
+from agent_playbook.types import StreamEventType
+
+LEVELS = (1, 10, 100, 1000)
+RESULTS_DIR = Path(".benchmarks")
+
+stream_event_adapter: TypeAdapter[StreamEventType] = TypeAdapter(StreamEventType)
+
+app = FastAPI()
+app.include_router(api_router)
+
+
+def _register_agents(chunks: int, latency: float) -> None:
+    async def stream_text(
+        messages: list[ModelMessage], info: AgentInfo
+    ) -> AsyncIterator[str | DeltaToolCalls]:
+        for i in range(chunks):
+            if latency:
+                await asyncio.sleep(latency)
+            yield f"word{i} "
+
+    export(
+        agent=Agent(FunctionModel(stream_function=stream_text), deps_type=dict),
+        agent_name="function",
+        scenarios=[],
+    )
+
+    test_agent = Agent(TestModel(), deps_type=dict)
+
+    @test_agent.tool_plain
+    def lookup(key: str) -> str:
+        return key
+
+    export(agent=test_agent, agent_name="test", scenarios=[])
+
+
+async def post_chat(body: bytes) -> tuple[float, float, bytes]:
+    """POST to /api/chat over ASGI; returns (ttfb, total, response body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat",
+        "raw_path": b"/api/chat",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+    chunks: list[bytes] = []
+    start = time.perf_counter()
+    ttfb = 0.0
+
+    async def receive() -> dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        nonlocal ttfb
+        if message["type"] != "http.response.body":
+            return
+        if message.get("body"):
+            if not chunks:
+                ttfb = time.perf_counter() - start
+            chunks.append(message["body"])
+        if not message.get("more_body"):
+            disconnected.set()
+
+    await app(scope, receive, send)
+    return ttfb, time.perf_counter() - start, b"".join(chunks)
+
+
+async def conversation(agent: str, turns: int, samples: list[float]) -> None:
+    messages: list[dict[str, Any]] = []
+    for turn in range(turns):
+        messages.append(
+            {
+                "kind": "request",
+                "parts": [{"part_kind": "user-prompt", "content": f"turn {turn}"}],
+            }
+        )
+        body = json.dumps({"agent": agent, "messages": messages}).encode()
+        ttfb, _, response = await post_chat(body)
+        samples.append(ttfb)
+        for line in response.splitlines():
+            event = json.loads(line)
+            if event["type"] == "message_history":
+                messages = event["message_history"]
+            elif event["type"] == "error":
+                raise RuntimeError(event["error"])
+
+
+async def run_level(agent: str, concurrency: int, turns: int) -> dict[str, Any]:
+    samples: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(conversation(agent, turns, samples) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else []
+
+    def percentile(p: int) -> float:
+        value = quantiles[p - 1] if quantiles else samples[0]
+        return value * 1000
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "requests_per_sec": len(samples) / elapsed,
+        "ttfb_ms_p50": percentile(50),
+        "ttfb_ms_p95": percentile(95),
+        "ttfb_ms_p99": percentile(99),
+    }
+
+
+async def memory_per_stream(agent: str, concurrency: int) -> float:
+    """Peak traced memory of `concurrency` single-turn streams, per stream."""
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    await asyncio.gather(*(conversation(agent, 1, []) for _ in range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (peak - baseline) / concurrency / 1024
+
+
+async def serialization_cost(agent: str) -> dict[str, float]:
+    """Microseconds to serialize one event of each type, as `chat()` does."""
+    body = json.dumps(
+        {
+            "agent": agent,
+            "messages": [
+                {
+                    "kind": "request",
+                    "parts": [{"part_kind": "user-prompt", "content": "hi"}],
+                }
+            ],
+            "delta_flush_ms": 0,
+        }
+    ).encode()
+    _, _, response = await post_chat(body)
+
+    costs: dict[str, float] = {}
+    for line in response.splitlines():
+        event = stream_event_adapter.validate_json(line)
+        if event.type in costs:
+            continue
+        number = 2000
+        seconds = min(timeit.repeat(event.model_dump_json, number=number, repeat=3))
+        costs[event.type] = seconds / number * 1e6
+    return costs
+
+
+def _ratio(level: dict[str, Any], before: dict[str, Any], key: str) -> str:
+    if not before.get(key) or level.get(key) is None:
+        return "-"
+    return f"{level[key] / before[key]:.2f}x"
+
+
+def compare(results: dict[str, Any], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nCompared to {baseline_path}:")
+    print(f"{'streams':>8}{'req/s':>10}{'ttfb p95':>10}{'KiB/stream':>12}")
+    for level in results["levels"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        print(
+            f"{level['concurrency']:>8}"
+            f"{_ratio(level, before, 'requests_per_sec'):>10}"
+            f"{_ratio(level, before, 'ttfb_ms_p95'):>10}"
+            f"{_ratio(level, before, 'memory_kib_per_stream'):>12}"
+        )
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    _register_agents(args.chunks, args.model_latency_ms / 1000)
+    levels = [int(level) for level in args.levels.split(",")]
+
+    results: dict[str, Any] = {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "agent": args.agent,
+        "turns": args.turns,
+        "chunks": args.chunks,
+        "model_latency_ms": args.model_latency_ms,
+        "serialization_us": await serialization_cost(args.agent),
+        "levels": [],
+    }
+
+    print(
+        f"{'streams':>8}{'requests':>10}{'req/s':>10}"
+        f"{'ttfb p50':>10}{'ttfb p95':>10}{'ttfb p99':>10}{'KiB/stream':>12}"
+    )
+    for concurrency in levels:
+        level = await run_level(args.agent, concurrency, args.turns)
+        if not args.no_memory:
+            level["memory_kib_per_stream"] = await memory_per_stream(
+                args.agent, concurrency
+            )
+        results["levels"].append(level)
+        memory = level.get("memory_kib_per_stream")
+        print(
+            f"{concurrency:>8}{level['requests']:>10}"
+            f"{level['requests_per_sec']:>10.0f}{level['ttfb_ms_p50']:>10.2f}"
+            f"{level['ttfb_ms_p95']:>10.2f}{level['ttfb_ms_p99']:>10.2f}"
+            f"{'-' if memory is None else f'{memory:.1f}':>12}"
+        )
+
+    print("\nSerialization per event (us):")
+    for event_type, cost in results["serialization_us"].items():
+        print(f"  {event_type:<20}{cost:>8.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent", choices=["function", "test"], default="function")
+    parser.add_argument("--levels", default=",".join(str(level) for level in LEVELS))
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--chunks", type=int, default=50)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    output = args.output or RESULTS_DIR / (
+        f"chat_load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nSaved results to {output}")
+    if args.compare:
+        compare(results, args.compare)
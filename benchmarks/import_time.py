@@ -0,0 +1,87 @@
+"""Measure how long the CLI and package entry points take to import.
+
+Runs each entry point in a fresh interpreter with `python -X importtime`,
+reports the slowest top-level imports and fails when an entry point takes
+longer than `--budget-ms`. `tests/test_import_time.py` checks that they don't
+import the modules only needed to serve or run agents.
+
+Run with: python -m benchmarks.import_time [--budget-ms MS] [--top N]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+@dataclass
+class EntryPoint:
+    name: str
+    args: list[str]
+
+
+ENTRY_POINTS = [
+    EntryPoint("import agent_playbook", ["-c", "import agent_playbook"]),
+    EntryPoint("playbook --help", ["-m", "agent_playbook.cli", "--help"]),
+    EntryPoint(
+        "playbook start --help", ["-m", "agent_playbook.cli", "start", "--help"]
+    ),
+]
+
+
+@dataclass
+class Import:
+    module: str
+    cumulative_us: int
+    depth: int
+
+
+def measure(entry_point: EntryPoint) -> list[Import]:
+    env = dict(os.environ)
+    env.pop("AGENT_PLAYBOOK_DEV", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *entry_point.args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            _, cumulative, indent, module = match.groups()
+            imports.append(Import(module, int(cumulative), len(indent) // 2))
+    return imports
+
+
+def main(budget_ms: float | None, top: int) -> int:
+    failures = 0
+    for entry_point in ENTRY_POINTS:
+        imports = measure(entry_point)
+        total_ms = sum(i.cumulative_us for i in imports if i.depth == 0) / 1000
+        print(f"{entry_point.name}: {len(imports)} modules, {total_ms:.0f} ms")
+
+        slowest = sorted(
+            (i for i in imports if i.depth == 0),
+            key=lambda i: i.cumulative_us,
+            reverse=True,
+        )
+        for i in slowest[:top]:
+            print(f"  {i.cumulative_us / 1000:8.1f} ms  {i.module}")
+
+        if budget_ms is not None and total_ms > budget_ms:
+            failures += 1
+            print(f"  FAIL: over the {budget_ms:.0f} ms budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(main(args.budget_ms, args.top))
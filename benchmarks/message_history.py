@@ -0,0 +1,143 @@
+"""Benchmark parsing of chat message histories sent by the web UI.
+
+Compares the legacy dacite-based `from_dict` parsing with the pydantic-ai
+`ModelMessagesTypeAdapter` used by `build_message_history`, on histories of
+10, 100 and 1000 messages that mix every message part kind the UI sends.
+
+Run with: python -m benchmarks.message_history [--repeat N]
+"""
+
+import argparse
+import json
+import timeit
+from dataclasses import asdict
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any
+
+import dacite
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ThinkingPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.usage import RequestUsage
+
+from agent_playbook.api import build_message_history
+from agent_playbook.types import MessageHistoryEvent
+
+SIZES = (10, 100, 1000)
+
+
+def legacy_build_message_history(
+    conversation_history: list[dict[str, Any]],
+) -> list[ModelMessage]:
+    messages: list[ModelMessage] = []
+    dacite_config = dacite.Config(
+        type_hooks={
+            datetime: lambda s: datetime.fromisoformat(s.replace("Z", "+00:00"))
+        }
+    )
+    for msg in conversation_history:
+        kind = msg.get("kind")
+        if kind == "request":
+            messages.append(
+                dacite.from_dict(
+                    data_class=ModelRequest, data=msg, config=dacite_config
+                )
+            )
+        elif kind == "response":
+            messages.append(
+                dacite.from_dict(
+                    data_class=ModelResponse, data=msg, config=dacite_config
+                )
+            )
+        else:
+            raise RuntimeError(f"Unkown kind={kind}")
+
+    return messages
+
+
+def _turn(i: int) -> list[ModelMessage]:
+    now = datetime.now(timezone.utc)
+    call_id = f"call_{i}"
+    return [
+        ModelRequest(parts=[UserPromptPart(f"question {i}", timestamp=now)]),
+        ModelResponse(
+            parts=[
+                ThinkingPart(f"thinking about {i}"),
+                TextPart(f"let me check {i}"),
+                ToolCallPart("check_order_status", {"order_id": i}, call_id),
+            ],
+            usage=RequestUsage(input_tokens=10 * i, output_tokens=i),
+            model_name="test",
+            timestamp=now,
+        ),
+        ModelRequest(
+            parts=[
+                ToolReturnPart(
+                    "check_order_status", f"order {i}", call_id, timestamp=now
+                )
+            ]
+        ),
+        ModelResponse(
+            parts=[TextPart(f"answer {i}")], model_name="test", timestamp=now
+        ),
+    ]
+
+
+def make_history(size: int) -> list[dict[str, Any]]:
+    """Build a history as the UI sends it: serialized from MessageHistoryEvent."""
+    messages: list[ModelMessage] = [
+        ModelRequest(parts=[SystemPromptPart("You are a support agent.")])
+    ]
+    i = 0
+    while len(messages) < size:
+        messages.extend(_turn(i))
+        i += 1
+    event = MessageHistoryEvent(message_history=[asdict(m) for m in messages[:size]])
+    history: list[dict[str, Any]] = json.loads(event.model_dump_json())[
+        "message_history"
+    ]
+    return history
+
+
+def main(repeat: int) -> None:
+    print(f"{'messages':>9}{'dacite ms':>12}{'pydantic ms':>13}{'speedup':>9}")
+    for size in SIZES:
+        history = make_history(size)
+        if legacy_build_message_history(history) != build_message_history(history):
+            raise AssertionError(f"Parsers disagree on a {size}-message history")
+
+        number = max(1, 1000 // size)
+        legacy = min(
+            timeit.repeat(
+                partial(legacy_build_message_history, history),
+                number=number,
+                repeat=repeat,
+            )
+        )
+        current = min(
+            timeit.repeat(
+                partial(build_message_history, history),
+                number=number,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{size:>9}{legacy / number * 1000:>12.3f}"
+            f"{current / number * 1000:>13.3f}{legacy / current:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeat)
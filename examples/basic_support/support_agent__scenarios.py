@@ -28,6 +28,8 @@ export(
     agent=support_agent,
     agent_name="support_agent_ollama",
     model=ollama_qwen3,
+    # A local model serves one conversation at a time best, the others queue
+    max_concurrent_model_runs=1,
     scenarios=[
         {
             "name": "ACME Local",
@@ -1,9 +1,23 @@
+import gzip
 import shutil
 import subprocess
 import sys
 import zipfile
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:
+    # Served `.br` variants must not silently go missing from a release
+    sys.exit(
+        "❌ brotli is required to build the web UI: poetry install, "
+        "or pip install brotli"
+    )
+
+# Text assets worth compressing; images and fonts are compressed already
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".svg", ".json", ".map", ".txt"}
+MIN_COMPRESS_SIZE = 1024
+
 
 def create_zip(dist_dir: Path) -> None:
     with zipfile.ZipFile("webui.zip", "w") as z:
@@ -14,6 +28,24 @@ def create_zip(dist_dir: Path) -> None:
                 z.write(filepath, arcname=relative)
 
 
+def precompress(dist_dir: Path) -> None:
+    """Write `.br` and `.gz` variants next to the assets, served by Accept-Encoding."""
+    for path in list(dist_dir.rglob("*")):
+        if path.suffix not in COMPRESSIBLE_SUFFIXES or not path.is_file():
+            continue
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+        variants = {
+            ".gz": gzip.compress(data, compresslevel=9, mtime=0),
+            ".br": brotli.compress(data, quality=11),
+        }
+        for suffix, compressed in variants.items():
+            # Not worth a variant if it barely saves anything
+            if len(compressed) < len(data) * 0.9:
+                path.with_name(path.name + suffix).write_bytes(compressed)
+
+
 def build() -> None:
     with_zip = len(sys.argv) >= 2 and sys.argv[1] == "--zip"
     root = Path(__file__).parent.parent
@@ -24,6 +56,7 @@ def build() -> None:
     print("📦 Building React frontend...")
     subprocess.run(["npm", "ci"], cwd=webui_dir, check=True)
     subprocess.run(["npm", "run", "build"], cwd=webui_dir, check=True)
+    precompress(webui_dir / "dist")
     if with_zip:
         create_zip(webui_dir.joinpath("dist"))
 
@@ -1,3 +1,27 @@
-from ._export.export_agent import export
+import importlib
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["export"]
+if TYPE_CHECKING:
+    from ._export.export_agent import export
+    from .cassette import Cassette
+    from .dependency_cache import DependencyCache
+    from .hedging import HedgedModel
+
+__all__ = ["Cassette", "DependencyCache", "HedgedModel", "export"]
+
+# Imported on first use, so the CLI starts without loading pydantic-ai
+_LAZY_IMPORTS = {
+    "Cassette": ".cassette",
+    "DependencyCache": ".dependency_cache",
+    "HedgedModel": ".hedging",
+    "export": "._export.export_agent",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
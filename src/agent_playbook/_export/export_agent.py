@@ -5,6 +5,9 @@ from pydantic_ai import Agent
 from pydantic_ai.models import Model
 
 from agent_playbook.agent_loader import agent_loader
+from agent_playbook.cassette import Cassette
+from agent_playbook.dependency_cache import DependencyCache
+from agent_playbook.hedging import HedgedModel
 
 from .export_types import (
     ExportedAgent,
@@ -26,7 +29,11 @@ def export(
     agent: Agent[TSettings, TResp],
     scenarios: list[Scenario[TSettings]],
     agent_name: str | None = None,
-    model: Model | None = None,
+    model: Model | list[Model] | None = None,
+    dependency_cache: DependencyCache[TSettings] | None = None,
+    cassette: Cassette | None = None,
+    max_concurrent_runs: int | None = None,
+    max_concurrent_model_runs: int | None = None,
 ) -> None:
     pass
 
@@ -37,8 +44,12 @@ def export(
     agent: Agent[TDeps, TResp],
     scenarios: list[Scenario[TSettings]],
     agent_name: str | None = None,
-    model: Model | None = None,
+    model: Model | list[Model] | None = None,
     init_dependencies_fn: Callable[[TSettings], TDeps],
+    dependency_cache: DependencyCache[TDeps] | None = None,
+    cassette: Cassette | None = None,
+    max_concurrent_runs: int | None = None,
+    max_concurrent_model_runs: int | None = None,
 ) -> None:
     pass
 
@@ -48,8 +59,12 @@ def export(
     agent: Agent[TDeps, TResp],
     scenarios: list[Scenario[TSettings]],
     agent_name: str | None = None,
-    model: Model | None = None,
+    model: Model | list[Model] | None = None,
     init_dependencies_fn: Callable[[TSettings], TDeps] = _identity,
+    dependency_cache: DependencyCache[TDeps] | None = None,
+    cassette: Cassette | None = None,
+    max_concurrent_runs: int | None = None,
+    max_concurrent_model_runs: int | None = None,
 ) -> None:
     """
     Export an agent and its scenarios to be used in other contexts.
@@ -63,8 +78,25 @@ def export(
             The settings provided in each scenario are available for modification
         agent_name (str | None, optional): Custom name for the agent. If None, uses agent's name
             or generates a fallback name.
+        model (Model | list[Model] | None, optional): Model replacing the agent's own.
+            A list of models is raced as a `HedgedModel`: the first model is
+            primary and the next ones are backups, each started once the others
+            are late, after the default hedge delay of 1 second. Build the
+            `HedgedModel` yourself to change its hedge delay.
         init_dependencies_fn (Callable[[TSettings], TDeps], optional): Function to initialize
             agent dependencies from scenario settings. Defaults to identity function.
+        dependency_cache (DependencyCache[TDeps] | None, optional): Cache reusing the
+            dependencies built for identical settings across chat turns. If None,
+            dependencies are initialized on every run.
+        cassette (Cassette | None, optional): Cassette recording the model responses
+            and replaying them on identical requests. If None, the cassette of
+            `playbook start --cassette` is used, if any.
+        max_concurrent_runs (int | None, optional): Maximum number of runs of this
+            agent at once; further chat requests wait in a FIFO queue. If None,
+            `playbook start --max-runs-per-agent` applies, if set.
+        max_concurrent_model_runs (int | None, optional): Maximum number of runs at
+            once on this agent's model, shared with other agents using the same
+            model. If None, `playbook start --max-runs-per-model` applies, if set.
 
     Returns:
         None
@@ -79,6 +111,8 @@ def export(
         ```
     """
     name = agent_name or agent.name or _get_fallback_agent_name()
+    if isinstance(model, list):
+        model = HedgedModel(*model)
 
     exported_agent = ExportedAgent(
         agent=agent,
@@ -86,6 +120,10 @@ def export(
         agent_name=name,
         model=model,
         init_dependencies_fn=init_dependencies_fn,
+        dependency_cache=dependency_cache,
+        cassette=cassette,
+        max_concurrent_runs=max_concurrent_runs,
+        max_concurrent_model_runs=max_concurrent_model_runs,
     )
 
     agent_loader.register_agent(
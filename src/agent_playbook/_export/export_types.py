@@ -1,11 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Callable, Generic, TypeAlias, TypedDict, TypeVar
 
 from pydantic import BaseModel
-from pydantic_ai import Agent
+from pydantic_ai import AbstractToolset, Agent
 from pydantic_ai.models import Model
 from typing_extensions import NotRequired
 
+from agent_playbook.cassette import Cassette
+from agent_playbook.dependency_cache import DependencyCache
+
 StrDict: TypeAlias = dict[str, Any]
 BaseSettingsType: TypeAlias = BaseModel | StrDict
 
@@ -26,6 +29,14 @@ class ExportedAgent(Generic[TDeps, TResp, TSettings]):
     agent_name: str
     model: Model | None
     init_dependencies_fn: Callable[[TSettings], TDeps]
+    dependency_cache: DependencyCache[TDeps] | None = None
+    cassette: Cassette | None = None
+    max_concurrent_runs: int | None = None
+    max_concurrent_model_runs: int | None = None
+    # Approval-mode toolsets, built lazily on first use and reset on registration
+    approval_toolsets: list[AbstractToolset[TDeps]] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
 
 GenericExportedAgent: TypeAlias = ExportedAgent[Any, Any, BaseSettingsType]
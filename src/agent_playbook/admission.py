@@ -0,0 +1,130 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+
+
+@dataclass(eq=False)
+class _Waiter:
+    position: int = 0
+    admitted: bool = False
+    # Set whenever `position` or `admitted` changes
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class _Limiter:
+    """Admit at most `limit` runs at once, the others in first-come order."""
+
+    def __init__(self) -> None:
+        # The limit each agent asked for; the strictest one applies
+        self.limits: dict[str, int] = {}
+        self.active = 0
+        self._queue: deque[_Waiter] = deque()
+
+    @property
+    def limit(self) -> int:
+        return min(self.limits.values())
+
+    def set_limit(self, agent_name: str, limit: int) -> None:
+        if self.limits.get(agent_name) != limit:
+            # e.g. the agent was re-exported with another limit
+            self.limits[agent_name] = limit
+            self.update()
+
+    def enqueue(self) -> _Waiter:
+        waiter = _Waiter()
+        self._queue.append(waiter)
+        self.update()
+        return waiter
+
+    def remove(self, waiter: _Waiter) -> None:
+        if waiter.admitted:
+            self.active -= 1
+        else:
+            self._queue.remove(waiter)
+        self.update()
+
+    def update(self) -> None:
+        while self._queue and self.active < self.limit:
+            waiter = self._queue.popleft()
+            waiter.admitted = True
+            waiter.changed.set()
+            self.active += 1
+        for position, waiter in enumerate(self._queue, start=1):
+            if waiter.position != position:
+                waiter.position = position
+                waiter.changed.set()
+
+
+class Ticket:
+    """A run's place in the queues of its agent and model, then its slots in them."""
+
+    def __init__(self, limiters: list[_Limiter]) -> None:
+        self._limiters = limiters
+        self._waiters: list[tuple[_Limiter, _Waiter]] = []
+
+    async def wait(self) -> AsyncGenerator[int, None]:
+        """
+        Wait for a slot in every queue, in order.
+
+        Yields the position in the current queue (1 is next) whenever it
+        changes; returns without yielding when a slot is free right away.
+        """
+        for limiter in self._limiters:
+            waiter = limiter.enqueue()
+            self._waiters.append((limiter, waiter))
+            while not waiter.admitted:
+                waiter.changed.clear()
+                yield waiter.position
+                await waiter.changed.wait()
+
+    def release(self) -> None:
+        """Free the slots taken, or leave the queues of a run that gave up waiting."""
+        for limiter, waiter in reversed(self._waiters):
+            limiter.remove(waiter)
+        self._waiters.clear()
+
+
+class _AdmissionControl:
+    def __init__(self) -> None:
+        self.max_runs_per_agent: int | None = None
+        self.max_runs_per_model: int | None = None
+        self._limiters: dict[tuple[str, str], _Limiter] = {}
+
+    def configure(
+        self,
+        max_runs_per_agent: int | None = None,
+        max_runs_per_model: int | None = None,
+    ) -> None:
+        """Set the server-wide limits, used by agents exported without their own."""
+        self.max_runs_per_agent = max_runs_per_agent
+        self.max_runs_per_model = max_runs_per_model
+
+    def _limiter(self, kind: str, name: str, agent_name: str, limit: int) -> _Limiter:
+        limiter = self._limiters.get((kind, name))
+        if limiter is None:
+            limiter = _Limiter()
+            self._limiters[(kind, name)] = limiter
+        # Agents sharing a model may ask for different limits: the lowest wins,
+        # whichever agent ran last
+        limiter.set_limit(agent_name, limit)
+        return limiter
+
+    def ticket(
+        self,
+        agent_name: str,
+        model_name: str,
+        max_agent_runs: int | None = None,
+        max_model_runs: int | None = None,
+    ) -> Ticket:
+        agent_limit = max_agent_runs or self.max_runs_per_agent
+        model_limit = max_model_runs or self.max_runs_per_model
+        limiters = []
+        if agent_limit:
+            limiters.append(self._limiter("agent", agent_name, agent_name, agent_limit))
+        if model_limit:
+            limiters.append(self._limiter("model", model_name, agent_name, model_limit))
+        return Ticket(limiters)
+
+
+admission_control = _AdmissionControl()
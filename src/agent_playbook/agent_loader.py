@@ -1,7 +1,6 @@
 import importlib
 import logging
 import os
-import pkgutil
 import sys
 import types
 from contextlib import contextmanager
@@ -9,6 +8,14 @@ from pathlib import Path
 from typing import Iterator
 
 from ._export.export_types import GenericExportedAgent
+from .discovery_index import (
+    DiscoveryIndex,
+    IndexedAgent,
+    index_agent,
+    read_index,
+    scan_package,
+    write_index,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +32,19 @@ def _temp_sys_path_addition(path: str) -> Iterator[None]:
 class _AgentLoader:
     def __init__(self) -> None:
         self._agents: dict[str, GenericExportedAgent] = {}
+        # Agents known from a discovery index, whose module isn't imported yet
+        self._indexed_agents: dict[str, IndexedAgent] = {}
+        self._agent_modules: dict[str, str] = {}
+        self._importing_module = ""
+        # Agents registered during a hot reload, swapped in once it succeeds
+        self._staged_agents: dict[str, GenericExportedAgent] | None = None
+        self._loaded_packages: set[str] = set()
+        # Bumped whenever the registered agents change
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     def _import_package_with_fallback(self, package: str) -> types.ModuleType:
         try:
@@ -50,47 +70,150 @@ class _AgentLoader:
                 logger.error(f"Failed to import package '{package}': {e}")
                 raise
 
-    def _discover_modules(
-        self, pkg: types.ModuleType, package: str
-    ) -> list[types.ModuleType]:
-        modules: list[types.ModuleType] = []
-        for module_info in pkgutil.walk_packages(pkg.__path__, prefix=f"{package}."):
-            module_name = module_info.name
-            # Only import modules with __scenarios suffix
-            if not module_name.endswith("__scenarios"):
-                continue
-            try:
-                module = importlib.import_module(module_name)
-                modules.append(module)
-            except Exception as e:
-                logger.warning(f"Failed to import module '{module_name}': {e}")
-        return modules
+    def _import_scenarios_module(self, module_name: str) -> None:
+        self._importing_module = module_name
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Failed to import module '{module_name}': {e}")
+        finally:
+            self._importing_module = ""
+
+    def _discover_modules(self, module_names: list[str]) -> None:
+        for module_name in module_names:
+            self._import_scenarios_module(module_name)
+
+    def _build_index(
+        self, package: str, fingerprint: str, module_names: list[str]
+    ) -> DiscoveryIndex | None:
+        package_modules = set(module_names)
+        try:
+            return DiscoveryIndex(
+                package=package,
+                fingerprint=fingerprint,
+                agents=[
+                    index_agent(exported_agent, self._agent_modules[agent_name])
+                    for agent_name, exported_agent in self._agents.items()
+                    if self._agent_modules.get(agent_name) in package_modules
+                ],
+            )
+        except RuntimeError as e:
+            logger.warning(f"Not writing a discovery index for '{package}': {e}")
+            return None
 
     def register_agent(
         self,
         exported_agent: GenericExportedAgent,
         module_name: str = "",
     ) -> None:
+        module_name = module_name or self._importing_module
         agent_name = exported_agent.agent_name
-        if agent_name in self._agents:
+        agents = self._agents if self._staged_agents is None else self._staged_agents
+        if agent_name in agents:
             logger.warning(
                 f"Duplicate agent name '{agent_name}' found in module '{module_name}'. "
                 f"Overwriting previous agent."
             )
-        self._agents[agent_name] = exported_agent
+        exported_agent.approval_toolsets = None
+        agents[agent_name] = exported_agent
+        self._agent_modules[agent_name] = module_name
+        self._version += 1
 
         logger.info(f"Loaded agent '{agent_name}' from {module_name}")
 
-    def load(self, package: str) -> None:
+    def load(self, package: str, lazy: bool = True) -> None:
+        """
+        Discover the agents of a package.
+
+        With `lazy`, agents are read from the discovery index when no module of the
+        package changed since it was written, and their `__scenarios` module is
+        only imported on first use. Otherwise every scenario module is imported
+        and the index is rewritten.
+        """
+        if package in self._loaded_packages:
+            # Already preloaded, e.g. by the parent process before forking workers
+            return
+
         pkg = self._import_package_with_fallback(package)
 
         if not hasattr(pkg, "__path__"):
             logger.warning(f"'{package}' is not a package, skipping")
             return
 
-        self._discover_modules(pkg, package)
+        package_paths = list(pkg.__path__)
+        fingerprint, module_names = scan_package(package_paths, package)
+        index = read_index(package, package_paths, fingerprint) if lazy else None
+        if index is not None:
+            for indexed_agent in index.agents:
+                self._indexed_agents[indexed_agent.agent_name] = indexed_agent
+            self._version += 1
+            logger.info(
+                f"Loaded {len(index.agents)} agents of '{package}' from the discovery index"
+            )
+        else:
+            self._discover_modules(module_names)
+            new_index = self._build_index(package, fingerprint, module_names)
+            if new_index is not None:
+                write_index(new_index, package_paths)
+        self._loaded_packages.add(package)
+
+    def reload_modules(
+        self, module_names: list[str], removed_modules: set[str]
+    ) -> list[str]:
+        """
+        Re-import `module_names` in order and swap in the agents they export.
+
+        The swap happens only once every module imported successfully, and
+        replaces all agents of the reloaded and removed modules at once. Runs
+        already holding an agent keep using the old object.
+        Returns the names of the agents registered by the reload.
+        """
+        staged: dict[str, GenericExportedAgent] = {}
+        self._staged_agents = staged
+        try:
+            for module_name in module_names:
+                self._importing_module = module_name
+                module = sys.modules.get(module_name)
+                if module is None:
+                    importlib.import_module(module_name)
+                else:
+                    importlib.reload(module)
+        finally:
+            self._staged_agents = None
+            self._importing_module = ""
+
+        replaced = set(module_names) | removed_modules
+        agents: dict[str, GenericExportedAgent] = {}
+        for agent_name, exported_agent in self._agents.items():
+            if agent_name in staged:
+                agents[agent_name] = staged[agent_name]
+            elif self._agent_modules.get(agent_name) not in replaced:
+                agents[agent_name] = exported_agent
+        agents.update(staged)
+        self._agents = agents
+        self._indexed_agents = {
+            agent_name: indexed_agent
+            for agent_name, indexed_agent in self._indexed_agents.items()
+            if indexed_agent.module_name not in replaced
+        }
+        self._version += 1
+        return list(staged)
+
+    def loaded_agents(self) -> list[GenericExportedAgent]:
+        """Agents whose module is imported, without importing indexed ones."""
+        return list(self._agents.values())
+
+    def list_agents(self) -> list[IndexedAgent]:
+        agents = dict(self._indexed_agents)
+        for agent_name, exported_agent in self._agents.items():
+            agents[agent_name] = index_agent(
+                exported_agent, self._agent_modules.get(agent_name, "")
+            )
+        return list(agents.values())
 
     def get(self, agent_name: str) -> GenericExportedAgent:
+        if agent_name not in self._agents and agent_name in self._indexed_agents:
+            self._import_scenarios_module(self._indexed_agents[agent_name].module_name)
         return self._agents[agent_name]
 
 
@@ -0,0 +1,93 @@
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterable, Callable, Sequence
+from contextvars import ContextVar
+from typing import Any
+
+import anyio
+from pydantic_ai import AbstractToolset, Agent, AgentRunResultEvent, RunContext
+from pydantic_ai.messages import AgentStreamEvent
+from pydantic_ai.toolsets import ToolsetTool, WrapperToolset
+
+from .hedging import ModelRace, set_race_listener
+
+# Tool calls running as their own task (pydantic-ai runs parallel calls in
+# tasks it doesn't cancel), so a cancelled run can cancel them too
+_tool_tasks: ContextVar[set[asyncio.Task[Any]] | None] = ContextVar(
+    "_tool_tasks", default=None
+)
+
+
+class _TaskTrackingToolset(WrapperToolset[Any]):
+    async def call_tool(
+        self,
+        name: str,
+        tool_args: dict[str, Any],
+        ctx: RunContext[Any],
+        tool: ToolsetTool[Any],
+    ) -> Any:
+        tasks = _tool_tasks.get()
+        task = asyncio.current_task()
+        if tasks is None or task is None:
+            return await super().call_tool(name, tool_args, ctx, tool)
+        tasks.add(task)
+        try:
+            return await super().call_tool(name, tool_args, ctx, tool)
+        finally:
+            tasks.discard(task)
+
+
+async def stream_run_events(
+    agent: Agent[Any, Any],
+    user_prompt: str | None,
+    toolsets: Sequence[AbstractToolset[Any]],
+    on_model_race: Callable[[ModelRace], None] | None = None,
+    **run_kwargs: Any,
+) -> AsyncGenerator[AgentStreamEvent | AgentRunResultEvent[Any], None]:
+    """
+    Stream the events of an agent run with `toolsets`, like `Agent.run_stream_events`.
+
+    Unlike it, closing or cancelling the stream before the run ends (e.g. when the
+    client disconnects) cancels the run and its pending tool calls, instead of
+    leaving them running in the background. `on_model_race` is called as the
+    requests of hedged models are decided.
+    """
+    send_stream, receive_stream = anyio.create_memory_object_stream[
+        AgentStreamEvent | AgentRunResultEvent[Any]
+    ]()
+    tool_tasks: set[asyncio.Task[Any]] = set()
+
+    async def event_stream_handler(
+        _: RunContext[Any], events: AsyncIterable[AgentStreamEvent]
+    ) -> None:
+        async for event in events:
+            await send_stream.send(event)
+
+    async def run_agent() -> Any:
+        _tool_tasks.set(tool_tasks)
+        if on_model_race is not None:
+            set_race_listener(on_model_race)
+        async with send_stream:
+            return await agent.run(
+                user_prompt,
+                event_stream_handler=event_stream_handler,
+                infer_name=False,
+                **run_kwargs,
+            )
+
+    # The task copies the current context, overrides included
+    with agent.override(
+        tools=[], toolsets=[_TaskTrackingToolset(toolset) for toolset in toolsets]
+    ):
+        task = asyncio.create_task(run_agent())
+
+    try:
+        async with receive_stream:
+            async for event in receive_stream:
+                yield event
+        yield AgentRunResultEvent(await task)
+    finally:
+        pending = [t for t in (task, *tool_tasks) if not t.done()]
+        for pending_task in pending:
+            pending_task.cancel()
+        # Also retrieves the run's error if the stream was closed after it failed
+        await asyncio.gather(task, *pending, return_exceptions=True)
@@ -1,13 +1,17 @@
-from dataclasses import asdict, replace
-from datetime import datetime
-from typing import Any, AsyncIterator, Callable, Literal
-
-import dacite
-from dacite import from_dict
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+import asyncio
+import functools
+import hashlib
+import logging
+import time
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import asdict, dataclass, replace
+from typing import Annotated, Any, AsyncGenerator, AsyncIterator, Callable, Literal
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from pydantic_ai import (
+    AbstractToolset,
     AgentRunResultEvent,
     ApprovalRequired,
     DeferredToolRequests,
@@ -24,25 +28,59 @@ from pydantic_ai import (
 from pydantic_ai import DeferredToolResults as PydanticDeferredToolResults
 from pydantic_ai.messages import (
     ModelMessage,
-    ModelRequest,
-    ModelResponse,
+    ModelMessagesTypeAdapter,
     TextPart,
 )
+from pydantic_ai.models import Model, infer_model
 from pydantic_ai.tools import ToolFuncEither
 
+from ._export.export_types import GenericExportedAgent
+from .admission import admission_control
 from .agent_loader import agent_loader
+from .agent_run import stream_run_events
+from .cassette import get_default_cassette
+from .checkpoints import Checkpoint, checkpoint_store
+from .conversations import (
+    ConversationCursor,
+    UnknownConversationError,
+    get_conversation_store,
+)
+from .discovery_index import NO_SCENARIO, scenario_label
+from .metrics import CONTENT_TYPE, RunMetrics, metrics
+from .sessions import Session, session_store
+from .streaming import (
+    DEFAULT_FLUSH_MS,
+    DEFAULT_FLUSH_SIZE,
+    MAX_FLUSH_MS,
+    MAX_FLUSH_SIZE,
+    coalesce_deltas,
+    merge_streams,
+)
 from .types import (
+    ConversationSavedEvent,
     DeferredToolResults,
     DoneEvent,
     ErrorEvent,
+    MatrixRunEvent,
+    MatrixRunInfo,
+    MatrixRunsEvent,
+    MatrixRunSummary,
+    MatrixStreamEventType,
+    MatrixSummaryEvent,
     MessageHistoryEvent,
+    ModelRaceEvent,
+    QueuedEvent,
     StreamEventType,
     TextDeltaEvent,
     ThinkingDeltaEvent,
     ToolApprovalRequestEvent,
     ToolCallExecutingEvent,
     ToolResultEvent,
+    UsageEvent,
 )
+from .usage import UsageRecord, usage_ledger
+
+logger = logging.getLogger(__name__)
 
 api_router = APIRouter(prefix="/api")
 
@@ -61,65 +99,114 @@ class GetAgentsResponse(BaseModel):
     agents: list[AgentInfo]
 
 
-@api_router.get("/agents")
-async def get_agents() -> GetAgentsResponse:
-    agents = []
-    for exported_agent in agent_loader._agents.values():
-        settings_list = []
-        for scenario in exported_agent.scenarios:
-            settings_obj: Any = scenario.get("settings", {})
-            if isinstance(settings_obj, dict):
-                settings_data = settings_obj
-            elif isinstance(settings_obj, BaseModel):
-                settings_data = settings_obj.model_dump()
-            else:
-                raise RuntimeError(
-                    f"Settings type is not supported: {settings_obj.__class__.__name__}"
-                )
-            settings_list.append(
-                SettingsInfo(name=scenario["name"], data=settings_data)
-            )
-        agents.append(AgentInfo(name=exported_agent.agent_name, settings=settings_list))
+@dataclass
+class _AgentsResponseCache:
+    version: int
+    body: bytes
+    etag: str
+
+
+_agents_response_cache: _AgentsResponseCache | None = None
+
+
+def _build_agents_response() -> GetAgentsResponse:
+    agents = [
+        AgentInfo(
+            name=indexed_agent.agent_name,
+            settings=[
+                SettingsInfo(name=scenario.name, data=scenario.settings)
+                for scenario in indexed_agent.scenarios
+            ],
+        )
+        for indexed_agent in agent_loader.list_agents()
+    ]
     return GetAgentsResponse(agents=agents)
 
 
+def _cached_agents_response() -> _AgentsResponseCache:
+    global _agents_response_cache
+    version = agent_loader.version
+    if _agents_response_cache is None or _agents_response_cache.version != version:
+        body = _build_agents_response().model_dump_json().encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        _agents_response_cache = _AgentsResponseCache(version, body, etag)
+    return _agents_response_cache
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as required for If-None-Match (RFC 9110, section 13.1.2)
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == etag
+        for candidate in (value.strip() for value in if_none_match.split(","))
+    )
+
+
+@api_router.get("/agents", response_model=GetAgentsResponse)
+async def get_agents(
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    cached = _cached_agents_response()
+    # Clients may keep the response, but must revalidate it on every request
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and _etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+
 class ChatRequest(BaseModel):
     agent: str
-    messages: list[dict[str, Any]]
+    messages: list[dict[str, Any]] = []
+    # Session mode: the server keeps the history, `messages` only holds new ones
+    session_id: str | None = None
+    reset_session: bool = False
+    # Stored conversation mode: the run continues the conversation after
+    # `message_id` (from its start if None), `messages` only holds new ones
+    conversation_id: str | None = None
+    message_id: int | None = None
     settings: dict[str, Any] = {}
     use_tools: Literal["auto", "request_approval"] = "auto"
     deferred_tool_results: DeferredToolResults | None = None
+    # Resumes a run paused for approvals; the server already has its history
+    resume_token: str | None = None
+    history_mode: Literal["full", "delta"] = "full"
+    # Text/thinking deltas are merged until they are this old or this large
+    # 0 sends every delta as it comes
+    delta_flush_ms: float = Field(DEFAULT_FLUSH_MS, ge=0, le=MAX_FLUSH_MS)
+    delta_flush_size: int = Field(DEFAULT_FLUSH_SIZE, ge=1, le=MAX_FLUSH_SIZE)
 
 
 def build_message_history(
     conversation_history: list[dict[str, Any]],
 ) -> list[ModelMessage]:
-    messages: list[ModelMessage] = []
-    dacite_config = dacite.Config(
-        type_hooks={
-            datetime: lambda s: datetime.fromisoformat(s.replace("Z", "+00:00"))
-        }
-    )
-    for msg in conversation_history:
-        kind = msg.get("kind")
-        if kind == "request":
-            messages.append(
-                from_dict(data_class=ModelRequest, data=msg, config=dacite_config)
-            )
-        elif kind == "response":
-            messages.append(
-                from_dict(data_class=ModelResponse, data=msg, config=dacite_config)
-            )
-        else:
-            raise RuntimeError(f"Unkown kind={kind}")
+    return ModelMessagesTypeAdapter.validate_python(conversation_history)
 
-    return messages
+
+def _get_approval_toolsets(
+    exported_agent: GenericExportedAgent,
+) -> list[AbstractToolset[Any]]:
+    if exported_agent.approval_toolsets is None:
+        exported_agent.approval_toolsets = [
+            _toolset_for_approval(ts) for ts in exported_agent.agent.toolsets
+        ]
+    return exported_agent.approval_toolsets
+
+
+def _toolset_for_approval(toolset: AbstractToolset[Any]) -> AbstractToolset[Any]:
+    if not isinstance(toolset, FunctionToolset):
+        return toolset.approval_required()
+
+    new_ts: FunctionToolset[Any] = FunctionToolset()
+    for tool in toolset.tools.values():
+        new_ts.add_tool(_tool_for_approval(tool))
+    return new_ts
 
 
 def _tool_for_approval(tool: Tool[Any]) -> Tool[Any]:
     new_tool = replace(tool)
     new_tool.function_schema = replace(new_tool.function_schema)
-    new_tool.function = _wrap_for_approval(new_tool.function, new_tool.takes_ctx)
+    new_tool.function = _wrap_for_approval(
+        new_tool.function, new_tool.takes_ctx, new_tool.function_schema.is_async
+    )
     new_tool.function_schema.function = new_tool.function
     new_tool.takes_ctx = True
     new_tool.function_schema.takes_ctx = True
@@ -127,7 +214,22 @@ def _tool_for_approval(tool: Tool[Any]) -> Tool[Any]:
     return new_tool
 
 
-def _wrap_for_approval(fn: Callable[..., Any], takes_ctx: bool) -> ToolFuncEither:
+def _wrap_for_approval(
+    fn: Callable[..., Any], takes_ctx: bool, is_async: bool
+) -> ToolFuncEither:
+    # Keep the calling convention of the wrapped tool: pydantic-ai awaits async
+    # tools on the event loop and runs sync tools in its worker thread pool.
+    if is_async:
+
+        async def async_decorator(ctx: RunContext[Any], **kwargs: Any) -> Any:
+            if not ctx.tool_call_approved:
+                raise ApprovalRequired
+            if takes_ctx:
+                return await fn(ctx, **kwargs)
+            return await fn(**kwargs)
+
+        return async_decorator
+
     def decorator(ctx: RunContext[Any], **kwargs: Any) -> Any:
         if not ctx.tool_call_approved:
             raise ApprovalRequired
@@ -138,6 +240,82 @@ def _wrap_for_approval(fn: Callable[..., Any], takes_ctx: bool) -> ToolFuncEithe
     return decorator
 
 
+def _common_prefix_length(
+    previous: list[ModelMessage], current: list[ModelMessage]
+) -> int:
+    # pydantic-ai keeps the history objects it was given, so identity is the fast path
+    length = 0
+    for before, after in zip(previous, current, strict=False):
+        if before is not after and before != after:
+            break
+        length += 1
+    return length
+
+
+@asynccontextmanager
+async def _dependencies(
+    exported_agent: GenericExportedAgent,
+    settings: dict[str, Any],
+    resumed: Checkpoint | None = None,
+) -> AsyncIterator[Any]:
+    cache = exported_agent.dependency_cache
+    if resumed is not None and cache is None:
+        # Built before the run paused; cached ones are leased again below
+        yield resumed.deps
+        return
+
+    # Initialize dependencies using the settings and init_dependencies_fn
+    init_fn: Callable[[Any], Any]
+    if exported_agent.scenarios:
+        settings_type = type(exported_agent.scenarios[0].get("settings") or {})
+        settings_obj: Any = settings_type(**settings)
+        init_fn = exported_agent.init_dependencies_fn
+    else:
+        settings_obj = settings
+        deps_type = exported_agent.agent.deps_type
+
+        def init_fn(s: Any) -> Any:
+            return deps_type(**s)
+
+    if cache is None:
+        yield init_fn(settings_obj)
+        return
+    async with cache.lease(settings_obj, init_fn) as deps:
+        yield deps
+
+
+def _run_model(
+    exported_agent: GenericExportedAgent, model_override: str | None = None
+) -> Model | str | None:
+    cassette = exported_agent.cassette or get_default_cassette()
+    model = model_override or exported_agent.model or exported_agent.agent.model
+    if cassette is None or model is None:
+        return model_override or exported_agent.model
+    return cassette.wrap(model)
+
+
+@functools.cache
+def _model_name_label(model_name: str) -> str:
+    # "test" and "test:test" are the same model, so they share limits and usage
+    try:
+        model = infer_model(model_name)
+    except Exception:
+        # e.g. its provider's API key isn't set; the run itself reports it
+        return model_name
+    return f"{model.system}:{model.model_name}"
+
+
+def _model_label(
+    exported_agent: GenericExportedAgent, model_override: str | None = None
+) -> str:
+    model = model_override or exported_agent.model or exported_agent.agent.model
+    if isinstance(model, Model):
+        return f"{model.system}:{model.model_name}"
+    if model is None:
+        return "unknown"
+    return _model_name_label(model)
+
+
 async def stream_agent_events(
     agent_name: str,
     user_prompt: str | None,
@@ -145,20 +323,100 @@ async def stream_agent_events(
     settings: dict[str, Any],
     use_tools: Literal["auto", "request_approval"],
     deferred_tool_results: DeferredToolResults | None = None,
-) -> AsyncIterator[StreamEventType]:
-    exported_agent = agent_loader.get(agent_name)
+    session: Session | None = None,
+    history_mode: Literal["full", "delta"] = "full",
+    run_metrics: RunMetrics | None = None,
+    resumed: Checkpoint | None = None,
+    conversation: ConversationCursor | None = None,
+    model: str | None = None,
+    scenario: str | None = None,
+) -> AsyncGenerator[StreamEventType, None]:
+    exported_agent = (
+        resumed.exported_agent if resumed is not None else agent_loader.get(agent_name)
+    )
+    model_label = _model_label(exported_agent, model)
+    # Callers running a known scenario name it, even if its settings equal another's
+    if scenario is None:
+        scenario = scenario_label(exported_agent, settings)
+    # Usage is also queried per session, or per stored conversation
+    usage_session_id = session.session_id if session is not None else None
+    if conversation is not None:
+        usage_session_id = conversation.conversation_id
+    run_metrics = run_metrics or RunMetrics()
+    run_metrics.start(agent=agent_name, scenario=scenario, model=model_label)
+    ticket = admission_control.ticket(
+        agent_name,
+        model_label,
+        max_agent_runs=exported_agent.max_concurrent_runs,
+        max_model_runs=exported_agent.max_concurrent_model_runs,
+    )
+    run = _run_agent(
+        exported_agent,
+        user_prompt,
+        message_history,
+        settings,
+        use_tools,
+        deferred_tool_results,
+        session,
+        history_mode,
+        resumed,
+        conversation,
+        model,
+    )
+    try:
+        async with aclosing(ticket.wait()) as queue:
+            async for position in queue:
+                run_metrics.queued()
+                yield QueuedEvent(position=position)
+        run_metrics.admitted()
+        # Closing the run as soon as this stream is closed cancels the agent run
+        async with aclosing(run):
+            async for event in run:
+                run_metrics.observe(event)
+                if event.type == "usage":
+                    usage_ledger.record(
+                        UsageRecord(
+                            agent=agent_name,
+                            scenario=scenario,
+                            model=model_label,
+                            session_id=usage_session_id,
+                            input_tokens=event.input_tokens,
+                            output_tokens=event.output_tokens,
+                            requests=event.requests,
+                            tool_calls=event.tool_calls,
+                            cost=event.cost,
+                        )
+                    )
+                yield event
+    except (asyncio.CancelledError, GeneratorExit):
+        if not run_metrics.status:
+            run_metrics.status = "cancelled"
+            logger.info(f"Run of agent '{agent_name}' cancelled before it finished")
+        raise
+    finally:
+        ticket.release()
+        run_metrics.finish()
+
+
+async def _run_agent(
+    exported_agent: GenericExportedAgent,
+    user_prompt: str | None,
+    message_history: list[ModelMessage],
+    settings: dict[str, Any],
+    use_tools: Literal["auto", "request_approval"],
+    deferred_tool_results: DeferredToolResults | None,
+    session: Session | None,
+    history_mode: Literal["full", "delta"],
+    resumed: Checkpoint | None,
+    conversation: ConversationCursor | None,
+    model: str | None,
+) -> AsyncGenerator[StreamEventType, None]:
     agent = exported_agent.agent
     toolsets = agent.toolsets
-    if use_tools == "request_approval":
-        toolsets = []
-        for ts in agent.toolsets:
-            assert isinstance(ts, FunctionToolset)
-            new_ts = FunctionToolset()
-            for tool in ts.tools.values():
-                new_tool = _tool_for_approval(tool)
-
-                new_ts.add_tool(new_tool)
-            toolsets.append(new_ts)
+    if resumed is not None:
+        toolsets = resumed.toolsets
+    elif use_tools == "request_approval":
+        toolsets = _get_approval_toolsets(exported_agent)
 
     # Convert deferred tool results if provided
     pydantic_deferred_results: PydanticDeferredToolResults | None = None
@@ -174,91 +432,484 @@ async def stream_agent_events(
                 # Approve/Reject: use boolean
                 pydantic_deferred_results.approvals[tool_id] = approved
 
-    # Initialize dependencies using the settings and init_dependencies_fn
-    if exported_agent.scenarios:
-        settings_type = type(exported_agent.scenarios[0].get("settings") or {})
-        settings_obj = settings_type(**settings)
-        deps = exported_agent.init_dependencies_fn(settings_obj)
-    else:
-        deps = agent.deps_type(**settings)
-
-    with agent.override(tools=[], toolsets=toolsets):
+    # Decided before the winner's first event is streamed, so reported right before it
+    races: list[ModelRaceEvent] = []
+
+    async with _dependencies(exported_agent, settings, resumed) as deps:
+        events = stream_run_events(
+            agent,
+            user_prompt,
+            toolsets,
+            on_model_race=lambda race: races.append(
+                ModelRaceEvent.model_validate(asdict(race))
+            ),
+            message_history=message_history,
+            deps=deps,
+            model=_run_model(exported_agent, model),
+            deferred_tool_results=pydantic_deferred_results,
+        )
         try:
-            async for event in agent.run_stream_events(
-                user_prompt,
-                message_history=message_history,
-                deps=deps,
-                model=exported_agent.model,
-                deferred_tool_results=pydantic_deferred_results,
-            ):
-                if isinstance(event, PartStartEvent):
-                    if isinstance(event.part, TextPart):
-                        yield TextDeltaEvent(delta=event.part.content)
-                elif isinstance(event, PartDeltaEvent):
-                    if isinstance(event.delta, TextPartDelta):
-                        yield TextDeltaEvent(delta=event.delta.content_delta)
-                    elif isinstance(event.delta, ThinkingPartDelta):
-                        yield ThinkingDeltaEvent(delta=str(event.delta.content_delta))
-                elif isinstance(event, FunctionToolCallEvent):
-                    yield ToolCallExecutingEvent(
-                        tool_call_id=event.part.tool_call_id,
-                        tool_name=event.part.tool_name,
-                        arguments=event.part.args_as_dict(),
-                    )
-                elif isinstance(event, FunctionToolResultEvent):
-                    yield ToolResultEvent(
-                        tool_call_id=event.tool_call_id,
-                        result=event.result.content,
-                    )
-                elif isinstance(event, AgentRunResultEvent):
-                    yield MessageHistoryEvent(
-                        message_history=[asdict(m) for m in event.result.all_messages()]
-                    )
-                    agent_output = event.result.output
-                    if isinstance(agent_output, DeferredToolRequests):
-                        # Yield approval request for each deferred tool
-                        for tool_call in agent_output.approvals:
-                            yield ToolApprovalRequestEvent(
-                                tool_call_id=tool_call.tool_call_id,
-                                tool_name=tool_call.tool_name,
-                                arguments=tool_call.args_as_dict(),
+            async with aclosing(events):
+                async for event in events:
+                    while races:
+                        yield races.pop(0)
+                    if isinstance(event, PartStartEvent):
+                        if isinstance(event.part, TextPart):
+                            yield TextDeltaEvent(delta=event.part.content)
+                    elif isinstance(event, PartDeltaEvent):
+                        if isinstance(event.delta, TextPartDelta):
+                            yield TextDeltaEvent(delta=event.delta.content_delta)
+                        elif isinstance(event.delta, ThinkingPartDelta):
+                            yield ThinkingDeltaEvent(
+                                delta=str(event.delta.content_delta)
                             )
-                        yield DoneEvent(status="pending_approval")
-                    else:
-                        yield DoneEvent(status="complete")
+                    elif isinstance(event, FunctionToolCallEvent):
+                        yield ToolCallExecutingEvent(
+                            tool_call_id=event.part.tool_call_id,
+                            tool_name=event.part.tool_name,
+                            arguments=event.part.args_as_dict(),
+                        )
+                    elif isinstance(event, FunctionToolResultEvent):
+                        yield ToolResultEvent(
+                            tool_call_id=event.tool_call_id,
+                            result=event.result.content,
+                        )
+                    elif isinstance(event, AgentRunResultEvent):
+                        all_messages = event.result.all_messages()
+                        if session is not None:
+                            session.messages = all_messages
+                        prefix_length = 0
+                        if history_mode == "delta":
+                            prefix_length = _common_prefix_length(
+                                message_history, all_messages
+                            )
+                        yield MessageHistoryEvent(
+                            message_history=[
+                                asdict(m) for m in all_messages[prefix_length:]
+                            ],
+                            prefix_length=prefix_length,
+                        )
+                        if conversation is not None:
+                            await asyncio.to_thread(
+                                get_conversation_store().save,
+                                conversation,
+                                all_messages,
+                                keep=_common_prefix_length(
+                                    conversation.messages, all_messages
+                                ),
+                            )
+                            yield ConversationSavedEvent(
+                                conversation_id=conversation.conversation_id,
+                                message_ids=conversation.message_ids,
+                            )
+                        usage = event.result.usage()
+                        yield UsageEvent(
+                            input_tokens=usage.input_tokens,
+                            output_tokens=usage.output_tokens,
+                            requests=usage.requests,
+                            tool_calls=usage.tool_calls,
+                            cost=usage_ledger.cost(event.result.new_messages()),
+                        )
+                        agent_output = event.result.output
+                        if isinstance(agent_output, DeferredToolRequests):
+                            # Yield approval request for each deferred tool
+                            for tool_call in agent_output.approvals:
+                                yield ToolApprovalRequestEvent(
+                                    tool_call_id=tool_call.tool_call_id,
+                                    tool_name=tool_call.tool_name,
+                                    arguments=tool_call.args_as_dict(),
+                                )
+                            checkpoint = Checkpoint(
+                                exported_agent=exported_agent,
+                                messages=all_messages,
+                                settings=settings,
+                                use_tools=use_tools,
+                                toolsets=toolsets,
+                                deps=deps
+                                if exported_agent.dependency_cache is None
+                                else None,
+                                session=session,
+                                conversation=conversation,
+                                model=model,
+                            )
+                            yield DoneEvent(
+                                status="pending_approval",
+                                resume_token=checkpoint_store.put(checkpoint),
+                            )
+                        else:
+                            yield DoneEvent(status="complete")
         except Exception as e:
             yield ErrorEvent(error=str(e))
             yield DoneEvent(status="complete")
 
 
+async def _resolve_conversation(req: ChatRequest) -> ConversationCursor | None:
+    if req.conversation_id is None:
+        return None
+    if req.session_id is not None:
+        raise HTTPException(
+            status_code=422, detail="Pass either a session_id or a conversation_id"
+        )
+    try:
+        cursor = await asyncio.to_thread(
+            get_conversation_store().cursor, req.conversation_id, req.message_id
+        )
+    except UnknownConversationError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown conversation {e}") from e
+    if cursor.agent != req.agent:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Conversation {req.conversation_id} belongs to agent "
+            f"'{cursor.agent}', not '{req.agent}'",
+        )
+    return cursor
+
+
+def _resolve_message_history(
+    req: ChatRequest, conversation: ConversationCursor | None = None
+) -> tuple[list[ModelMessage], Session | None]:
+    new_messages = build_message_history(req.messages)
+    if conversation is not None:
+        return [*conversation.messages, *new_messages], None
+
+    if req.session_id is None:
+        return new_messages, None
+
+    if req.reset_session:
+        return new_messages, session_store.reset(req.session_id)
+
+    session = session_store.get(req.session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown session '{req.session_id}'"
+        )
+    return [*session.messages, *new_messages], session
+
+
+def _resolve_checkpoint(req: ChatRequest) -> Checkpoint | None:
+    if req.resume_token is None:
+        return None
+    if req.deferred_tool_results is None:
+        raise HTTPException(
+            status_code=422, detail="resume_token requires deferred_tool_results"
+        )
+    checkpoint = checkpoint_store.get(req.resume_token)
+    # After a reload the agent may have other tools, so the client must resend
+    # the history, as it does for an expired token. A request naming another
+    # agent leaves the token to the run it belongs to.
+    if checkpoint is None or not any(
+        exported_agent is checkpoint.exported_agent
+        for exported_agent in agent_loader.loaded_agents()
+        if exported_agent.agent_name == req.agent
+    ):
+        raise HTTPException(
+            status_code=404, detail=f"Unknown resume token '{req.resume_token}'"
+        )
+    checkpoint_store.pop(req.resume_token)
+    return checkpoint
+
+
 @api_router.post("/chat")
 async def chat(req: ChatRequest) -> StreamingResponse:
-    # Extract the last user message and build conversation history
-    if not req.messages:
-        raise ValueError("No messages provided")
-
-    # Get all messages except the last one as conversation history
-    message_history = build_message_history(req.messages)
     user_prompt: str | None = None
-    last_message = message_history[-1]
-    if (
-        last_message.kind == "request"
-        and last_message.parts[0].part_kind == "user-prompt"
-    ):
-        message_history.pop()
-        user_prompt = str(last_message.parts[0].content)
+    resumed = _resolve_checkpoint(req)
+    if resumed is not None:
+        message_history, session = resumed.messages, resumed.session
+        conversation, model = resumed.conversation, resumed.model
+        settings, use_tools = resumed.settings, resumed.use_tools
+    else:
+        conversation, model = await _resolve_conversation(req), None
+        message_history, session = _resolve_message_history(req, conversation)
+        settings, use_tools = req.settings, req.use_tools
+
+        # Extract the last user message and build conversation history
+        if not message_history:
+            raise ValueError("No messages provided")
+
+        last_message = message_history[-1]
+        if (
+            last_message.kind == "request"
+            and last_message.parts[0].part_kind == "user-prompt"
+        ):
+            message_history.pop()
+            user_prompt = str(last_message.parts[0].content)
 
-    # Get the last message content as the current message
+    run_metrics = RunMetrics()
 
     async def stream() -> AsyncIterator[bytes]:
-        async for event in stream_agent_events(
+        events = stream_agent_events(
             agent_name=req.agent,
             user_prompt=user_prompt,
             message_history=message_history,
-            settings=req.settings,
-            use_tools=req.use_tools,
+            settings=settings,
+            use_tools=use_tools,
             deferred_tool_results=req.deferred_tool_results,
-        ):
-            yield f"{event.model_dump_json()}\n".encode()
+            session=session,
+            history_mode=req.history_mode,
+            run_metrics=run_metrics,
+            resumed=resumed,
+            conversation=conversation,
+            model=model,
+        )
+        frames = coalesce_deltas(
+            events, flush_ms=req.delta_flush_ms, flush_size=req.delta_flush_size
+        )
+        # When the client disconnects, the coalescing is stopped first, then the
+        # run, so no model request or tool call outlives the response
+        async with aclosing(events), aclosing(frames):
+            async for event in frames:
+                data = f"{event.model_dump_json()}\n".encode()
+                run_metrics.streamed(event, len(data))
+                yield data
 
     return StreamingResponse(content=stream(), media_type="application/x-ndjson")
+
+
+class MatrixRun(BaseModel):
+    agent: str
+    # None runs every scenario of the agent
+    scenario: str | None = None
+    # Model to run instead of the agent's, e.g. "openai:gpt-4o"
+    model: str | None = None
+
+
+class MatrixRequest(BaseModel):
+    prompt: str
+    runs: list[MatrixRun]
+    # 0 sends every delta as it comes
+    delta_flush_ms: float = Field(DEFAULT_FLUSH_MS, ge=0, le=MAX_FLUSH_MS)
+    delta_flush_size: int = Field(DEFAULT_FLUSH_SIZE, ge=1, le=MAX_FLUSH_SIZE)
+
+
+def _expand_matrix(
+    req: MatrixRequest,
+) -> list[tuple[MatrixRunInfo, dict[str, Any], str | None]]:
+    indexed_agents = {
+        indexed_agent.agent_name: indexed_agent
+        for indexed_agent in agent_loader.list_agents()
+    }
+    runs: list[tuple[MatrixRunInfo, dict[str, Any], str | None]] = []
+    for run in req.runs:
+        indexed_agent = indexed_agents.get(run.agent)
+        if indexed_agent is None:
+            raise HTTPException(status_code=404, detail=f"Unknown agent '{run.agent}'")
+        scenarios = [
+            scenario
+            for scenario in indexed_agent.scenarios or [NO_SCENARIO]
+            if run.scenario is None or scenario.name == run.scenario
+        ]
+        if not scenarios:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unknown scenario '{run.scenario}' of agent '{run.agent}'",
+            )
+        model_label = _model_label(agent_loader.get(run.agent), run.model)
+        for scenario in scenarios:
+            info = MatrixRunInfo(
+                run_id=f"run-{len(runs)}",
+                agent=run.agent,
+                scenario=scenario.name,
+                model=model_label,
+            )
+            runs.append((info, scenario.settings, run.model))
+    return runs
+
+
+async def _matrix_run(
+    info: MatrixRunInfo, prompt: str, settings: dict[str, Any], model: str | None
+) -> AsyncGenerator[StreamEventType, None]:
+    events = stream_agent_events(
+        info.agent,
+        prompt,
+        [],
+        settings,
+        "auto",
+        model=model,
+        scenario=info.scenario,
+    )
+    try:
+        async with aclosing(events):
+            async for event in events:
+                yield event
+    except Exception as e:
+        # e.g. the scenario settings don't validate; the other runs go on
+        yield ErrorEvent(error=str(e))
+        yield DoneEvent(status="complete")
+
+
+def _summarize(summary: MatrixRunSummary, event: StreamEventType, start: float) -> None:
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if event.type == "text_delta" and summary.first_delta_ms is None:
+        summary.first_delta_ms = elapsed_ms
+    elif event.type == "usage":
+        summary.input_tokens = event.input_tokens
+        summary.output_tokens = event.output_tokens
+        summary.cost = event.cost
+    elif event.type == "error":
+        summary.status = "error"
+        summary.error = event.error
+    elif event.type == "done":
+        summary.duration_ms = elapsed_ms
+        if summary.status != "error":
+            summary.status = event.status
+
+
+@api_router.post("/matrix")
+async def run_matrix(req: MatrixRequest) -> StreamingResponse:
+    """
+    Run one prompt against a selection of agents, scenarios and models at once.
+
+    The events of all runs are streamed as they arrive, each tagged with its run
+    id, and the stream ends with the latency and token usage of every run.
+    """
+    runs = _expand_matrix(req)
+
+    def frame(event: MatrixStreamEventType) -> bytes:
+        return f"{event.model_dump_json()}\n".encode()
+
+    async def stream() -> AsyncIterator[bytes]:
+        start = time.perf_counter()
+        summaries = {
+            info.run_id: MatrixRunSummary(run_id=info.run_id) for info, *_ in runs
+        }
+        yield frame(MatrixRunsEvent(runs=[info for info, *_ in runs]))
+
+        merged = merge_streams(
+            {
+                info.run_id: coalesce_deltas(
+                    _matrix_run(info, req.prompt, settings, model),
+                    flush_ms=req.delta_flush_ms,
+                    flush_size=req.delta_flush_size,
+                )
+                for info, settings, model in runs
+            }
+        )
+        # Closing the merged stream on disconnect cancels every run
+        async with aclosing(merged):
+            async for run_id, event in merged:
+                _summarize(summaries[run_id], event, start)
+                yield frame(MatrixRunEvent(run_id=run_id, event=event))
+
+        yield frame(MatrixSummaryEvent(runs=list(summaries.values())))
+
+    return StreamingResponse(content=stream(), media_type="application/x-ndjson")
+
+
+class CreateConversationRequest(BaseModel):
+    agent: str
+    scenario: str = ""
+
+
+class BranchInfo(BaseModel):
+    message_id: int
+    length: int
+    updated_at: float
+
+
+class ConversationInfo(BaseModel):
+    conversation_id: str
+    agent: str
+    scenario: str
+    created_at: float
+    branches: list[BranchInfo] = []
+
+
+class ListConversationsResponse(BaseModel):
+    conversations: list[ConversationInfo]
+
+
+class ConversationMessagesResponse(BaseModel):
+    message_ids: list[int]
+    messages: list[dict[str, Any]]
+
+
+@api_router.post("/conversations")
+async def create_conversation(req: CreateConversationRequest) -> ConversationInfo:
+    conversation = await asyncio.to_thread(
+        get_conversation_store().create, req.agent, req.scenario
+    )
+    return ConversationInfo.model_validate(asdict(conversation))
+
+
+@api_router.get("/conversations")
+async def list_conversations(
+    agent: str | None = None, scenario: str | None = None
+) -> ListConversationsResponse:
+    conversations = await asyncio.to_thread(
+        get_conversation_store().list_conversations, agent, scenario
+    )
+    return ListConversationsResponse(
+        conversations=[
+            ConversationInfo.model_validate(asdict(conversation))
+            for conversation in conversations
+        ]
+    )
+
+
+@api_router.get("/conversations/{conversation_id}/messages/{message_id}")
+async def get_conversation_messages(
+    conversation_id: str, message_id: int
+) -> ConversationMessagesResponse:
+    """The messages of the branch ending at `message_id`."""
+    try:
+        cursor = await asyncio.to_thread(
+            get_conversation_store().cursor, conversation_id, message_id
+        )
+    except UnknownConversationError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown conversation {e}") from e
+    return ConversationMessagesResponse(
+        message_ids=cursor.message_ids,
+        messages=[asdict(m) for m in cursor.messages],
+    )
+
+
+@api_router.delete("/conversations/{conversation_id}", status_code=204)
+async def delete_conversation(conversation_id: str) -> None:
+    try:
+        await asyncio.to_thread(get_conversation_store().delete, conversation_id)
+    except UnknownConversationError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown conversation {e}") from e
+
+
+class UsageTotalsInfo(BaseModel):
+    agent: str
+    scenario: str
+    model: str
+    runs: int
+    input_tokens: int
+    output_tokens: int
+    requests: int
+    tool_calls: int
+    cost: float | None
+
+
+class UsageResponse(BaseModel):
+    usage: list[UsageTotalsInfo]
+    # Runs kept in memory; the oldest are dropped first
+    records: int
+
+
+@api_router.get("/usage")
+async def get_usage(
+    agent: str | None = None,
+    scenario: str | None = None,
+    model: str | None = None,
+    session_id: str | None = None,
+    since: float | None = None,
+) -> UsageResponse:
+    """
+    Token usage and cost of recent runs, by agent, scenario and model.
+
+    `session_id` matches a session or a stored conversation, and `since` is a
+    Unix timestamp. The most expensive come first.
+    """
+    totals = usage_ledger.totals(agent, scenario, model, session_id, since)
+    return UsageResponse(
+        usage=[UsageTotalsInfo.model_validate(asdict(t)) for t in totals],
+        records=len(usage_ledger),
+    )
+
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
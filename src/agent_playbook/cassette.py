@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Literal, cast
+
+from pydantic import BaseModel, ValidationError
+from pydantic_ai import RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelResponse,
+    ModelResponseStreamEvent,
+    PartStartEvent,
+)
+from pydantic_ai.models import (
+    KnownModelName,
+    Model,
+    ModelRequestParameters,
+    StreamedResponse,
+)
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from .wrapped_stream import WrappedStreamedResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASSETTE_DIR = Path(".agent-playbook") / "cassettes"
+
+CassetteMode = Literal["record", "replay"]
+
+# Fields that change on every run without changing what the model is asked
+_VOLATILE_FIELDS = frozenset({"timestamp"})
+
+
+class CassetteMissError(RuntimeError):
+    pass
+
+
+class _TimedEvent(BaseModel):
+    offset: float
+    event: ModelResponseStreamEvent
+
+
+class _Recording(BaseModel):
+    model_name: str
+    duration: float
+    events: list[_TimedEvent]
+    response: ModelResponse
+
+
+def _strip_volatile(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {
+            key: _strip_volatile(value)
+            for key, value in data.items()
+            if key not in _VOLATILE_FIELDS
+        }
+    if isinstance(data, list):
+        return [_strip_volatile(value) for value in data]
+    return data
+
+
+def request_key(
+    model: Model,
+    messages: list[ModelMessage],
+    model_settings: ModelSettings | None,
+    model_request_parameters: ModelRequestParameters,
+) -> str:
+    """Hash everything a model request depends on, except timestamps."""
+    data = {
+        "model": f"{model.system}:{model.model_name}",
+        "messages": _strip_volatile(
+            ModelMessagesTypeAdapter.dump_python(messages, mode="json")
+        ),
+        "model_settings": model_settings,
+        "parameters": asdict(model_request_parameters),
+    }
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _part_start_events(recording: _Recording) -> list[_TimedEvent]:
+    # Recorded without streaming: each part arrives whole once the response is done
+    return [
+        _TimedEvent(
+            offset=recording.duration, event=PartStartEvent(index=index, part=part)
+        )
+        for index, part in enumerate(recording.response.parts)
+    ]
+
+
+@dataclass
+class _RecordingStreamedResponse(WrappedStreamedResponse):
+    start: float = field(kw_only=True)
+    events: list[_TimedEvent] = field(default_factory=list, init=False)
+    completed: bool = field(default=False, init=False)
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        # Part end and final result events aren't recorded, they are derived
+        # from these both now and on replay
+        async for event in self.wrapped._get_event_iterator():
+            self.events.append(
+                _TimedEvent(offset=time.monotonic() - self.start, event=event)
+            )
+            yield event
+        self.completed = True
+
+
+@dataclass
+class _ReplayedStreamedResponse(StreamedResponse):
+    recording: _Recording = field(kw_only=True)
+    speed: float = field(kw_only=True)
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        final_parts = self.recording.response.parts
+        finished = 0
+
+        def finish_parts(until: int) -> None:
+            # Deltas aren't re-applied: once a part is complete, swap in its
+            # recorded final state so `get()` and part end events match
+            nonlocal finished
+            for index in range(finished, min(until, len(final_parts))):
+                self._parts_manager.handle_part(
+                    vendor_part_id=index, part=final_parts[index]
+                )
+            finished = max(finished, until)
+
+        start = time.monotonic()
+        for timed_event in self.recording.events or _part_start_events(self.recording):
+            delay = start + timed_event.offset / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            event = timed_event.event
+            if isinstance(event, PartStartEvent):
+                finish_parts(event.index)
+                self._parts_manager.handle_part(
+                    vendor_part_id=event.index, part=event.part
+                )
+            yield event
+        finish_parts(len(final_parts))
+
+        response = self.recording.response
+        self._usage = response.usage
+        self.provider_response_id = response.provider_response_id
+        self.provider_details = response.provider_details
+        self.finish_reason = response.finish_reason
+
+    @property
+    def model_name(self) -> str:
+        return self.recording.model_name
+
+    @property
+    def provider_name(self) -> str | None:
+        return self.recording.response.provider_name
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.recording.response.timestamp
+
+
+class CassetteModel(WrapperModel):
+    """
+    Replay recorded responses of the wrapped model, recording the missing ones.
+
+    Recordings are keyed on the message history (without timestamps), the model
+    settings and the request parameters, so rerunning an identical conversation
+    prefix never reaches the model.
+    """
+
+    def __init__(self, wrapped: Model | KnownModelName, cassette: "Cassette") -> None:
+        super().__init__(wrapped)
+        self._cassette = cassette
+
+    def _recording_or_miss(self, key: str) -> _Recording | None:
+        recording = self._cassette.read(key)
+        if recording is None and self._cassette.mode == "replay":
+            raise CassetteMissError(
+                f"No recording in cassette '{self._cassette.path}' for this "
+                f"request to {self.wrapped.model_name}"
+            )
+        return recording
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        key = request_key(
+            self.wrapped, messages, model_settings, model_request_parameters
+        )
+        recording = self._recording_or_miss(key)
+        if recording is not None:
+            await asyncio.sleep(recording.duration / self._cassette.speed)
+            return recording.response
+
+        start = time.monotonic()
+        response = await self.wrapped.request(
+            messages, model_settings, model_request_parameters
+        )
+        self._cassette.write(
+            key,
+            _Recording(
+                model_name=self.wrapped.model_name,
+                duration=time.monotonic() - start,
+                events=[],
+                response=response,
+            ),
+        )
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        key = request_key(
+            self.wrapped, messages, model_settings, model_request_parameters
+        )
+        recording = self._recording_or_miss(key)
+        if recording is not None:
+            yield _ReplayedStreamedResponse(
+                model_request_parameters=model_request_parameters,
+                recording=recording,
+                speed=self._cassette.speed,
+            )
+            return
+
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            recording_stream = _RecordingStreamedResponse(
+                model_request_parameters=stream.model_request_parameters,
+                wrapped=stream,
+                start=time.monotonic(),
+            )
+            yield recording_stream
+
+        if recording_stream.completed:
+            self._cassette.write(
+                key,
+                _Recording(
+                    model_name=stream.model_name,
+                    duration=time.monotonic() - recording_stream.start,
+                    events=recording_stream.events,
+                    response=stream.get(),
+                ),
+            )
+
+
+class Cassette:
+    """
+    Local store of recorded model responses.
+
+    In `record` mode, requests without a recording go to the model and are
+    recorded; in `replay` mode they fail, so runs never reach the network.
+    Recordings are streamed back `speed` times faster than they were recorded
+    (`float("inf")` replays instantly).
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_CASSETTE_DIR,
+        mode: CassetteMode = "record",
+        speed: float = 1.0,
+    ) -> None:
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.path = Path(path)
+        self.mode = mode
+        self.speed = speed
+        # Models inferred from their name, e.g. a model override of a request
+        self._named_models: dict[str, CassetteModel] = {}
+
+    def wrap(self, model: Model | str) -> CassetteModel:
+        if isinstance(model, Model):
+            # Wrapping a model instance is cheap and keeps nothing alive
+            return CassetteModel(model, self)
+        # Inferring a model builds its provider client, so it's done once per name
+        wrapped = self._named_models.get(model)
+        if wrapped is None:
+            wrapped = CassetteModel(cast("KnownModelName", model), self)
+            self._named_models[model] = wrapped
+        return wrapped
+
+    def _recording_path(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def read(self, key: str) -> _Recording | None:
+        try:
+            return _Recording.model_validate_json(
+                self._recording_path(key).read_bytes()
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError) as e:
+            logger.warning(f"Ignoring unreadable cassette recording '{key}': {e}")
+            return None
+
+    def write(self, key: str, recording: _Recording) -> None:
+        path = self._recording_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(recording.model_dump_json())
+            tmp_path.replace(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to write cassette recording to {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+
+_default_cassette: Cassette | None = None
+
+
+def set_default_cassette(cassette: Cassette | None) -> None:
+    """Use `cassette` for agents exported without one, e.g. from `--cassette`."""
+    global _default_cassette
+    _default_cassette = cassette
+
+
+def get_default_cassette() -> Cassette | None:
+    return _default_cassette
@@ -0,0 +1,82 @@
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from pydantic_ai import AbstractToolset
+from pydantic_ai.messages import ModelMessage
+
+from ._export.export_types import GenericExportedAgent
+from .conversations import ConversationCursor
+from .sessions import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHECKPOINTS = 1000
+DEFAULT_CHECKPOINT_TTL_SECONDS = 15 * 60
+
+
+@dataclass
+class Checkpoint:
+    """A run paused for tool approvals, with what it needs to resume."""
+
+    exported_agent: GenericExportedAgent
+    messages: list[ModelMessage]
+    settings: dict[str, Any]
+    use_tools: Literal["auto", "request_approval"]
+    toolsets: Sequence[AbstractToolset[Any]]
+    # Dependencies built for the run, None when the agent has a dependency cache
+    deps: Any
+    session: Session | None = None
+    conversation: ConversationCursor | None = None
+    # Model the run was started with instead of the agent's, if any
+    model: str | None = None
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class _CheckpointStore:
+    def __init__(
+        self,
+        max_checkpoints: int = DEFAULT_MAX_CHECKPOINTS,
+        ttl_seconds: float = DEFAULT_CHECKPOINT_TTL_SECONDS,
+    ) -> None:
+        self._max_checkpoints = max_checkpoints
+        self._ttl_seconds = ttl_seconds
+        self._checkpoints: OrderedDict[str, Checkpoint] = OrderedDict()
+
+    def _evict_expired(self, now: float) -> None:
+        # Checkpoints are kept in insertion order, so expired ones are first
+        while self._checkpoints:
+            token, checkpoint = next(iter(self._checkpoints.items()))
+            if now - checkpoint.last_used < self._ttl_seconds:
+                break
+            self._checkpoints.popitem(last=False)
+            logger.debug(f"Checkpoint '{token}' expired")
+
+    def put(self, checkpoint: Checkpoint) -> str:
+        """Keep `checkpoint` and return the token resuming it."""
+        now = time.monotonic()
+        self._evict_expired(now)
+        token = secrets.token_urlsafe(16)
+        checkpoint.last_used = now
+        self._checkpoints[token] = checkpoint
+        while len(self._checkpoints) > self._max_checkpoints:
+            evicted_token, _ = self._checkpoints.popitem(last=False)
+            logger.debug(f"Checkpoint '{evicted_token}' evicted")
+        return token
+
+    def get(self, token: str) -> Checkpoint | None:
+        """The checkpoint of `token`, left in place."""
+        self._evict_expired(time.monotonic())
+        return self._checkpoints.get(token)
+
+    def pop(self, token: str) -> Checkpoint | None:
+        """Take the checkpoint of `token`; each token resumes a run once."""
+        self._evict_expired(time.monotonic())
+        return self._checkpoints.pop(token, None)
+
+
+checkpoint_store = _CheckpointStore()
@@ -1,11 +1,19 @@
+import logging
 import os
-from typing import Annotated
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Annotated, Any, Literal
 
-import uvicorn
-from clantic import BaseCommand
+import click
+from clantic import BaseCommand, Group
 from clantic.types import Argument, Flag, Option, OptionSettings
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
+APP = "agent_playbook.server:app"
+
 
 class StartCommandParams(BaseModel):
     package: Argument[str]
@@ -15,6 +23,16 @@ class StartCommandParams(BaseModel):
     root_path: Option[str] = ""
     workers: Annotated[int, OptionSettings(aliases=["-w"])] = 1
     reload: Flag = False
+    hot_reload: Flag = False
+    cassette: Option[Literal["record", "replay"] | None] = None
+    cassette_dir: Option[str] = ""
+    cassette_speed: Option[float] = 1.0
+    conversation_db: Option[str] = ""
+    # JSON file of model prices, in dollars per million tokens
+    model_prices: Option[str] = ""
+    # 0 means no limit
+    max_runs_per_agent: Option[int] = 0
+    max_runs_per_model: Option[int] = 0
 
     dev: Annotated[int, OptionSettings(hidden=True, is_flag=True, default=False)] = (
         False
@@ -43,20 +61,124 @@ class StartCommand(BaseCommand[StartCommandParams]):
     NAME = "start"
 
     def run(self) -> None:
+        # Imported here, so `--help` and usage errors don't pay for it
+        import uvicorn
+
         self._prep_env()
+        workers = self.params.workers
+        if workers > 1 and (self.params.reload or self.params.dev):
+            logger.warning("--reload and --dev only support a single worker")
+            workers = 1
+
+        from .prefork import can_prefork
+
+        if workers > 1 and can_prefork():
+            self._run_prefork(workers)
+            return
+
         uvicorn.run(
-            "agent_playbook.server:app",
+            APP,
             host=self.params.host,
             port=self.params.port,
             root_path=self.params.root_path,
             reload=self.params.reload,
+            workers=workers,
+        )
+
+    def _run_prefork(self, workers: int) -> None:
+        import uvicorn
+
+        from .agent_loader import agent_loader
+        from .prefork import serve_prefork
+
+        config = uvicorn.Config(
+            APP,
+            host=self.params.host,
+            port=self.params.port,
+            root_path=self.params.root_path,
+            workers=workers,
         )
+        # Import the agents once in the parent, the workers inherit them on fork
+        agent_loader.load(self.params.package, lazy=False)
+        serve_prefork(config, workers)
 
     def _prep_env(self) -> None:
         os.environ.update(self.params.to_env_vars())
 
 
-cli = StartCommand.to_command()
+class RunCommandParams(BaseModel):
+    package: Argument[str]
+
+    prompt: Option[str] = ""
+    script: Option[str] = ""
+    agent: Option[str] = ""
+    concurrency: Annotated[int, OptionSettings(aliases=["-c"])] = 8
+    output: Annotated[str, OptionSettings(aliases=["-o"])] = "playbook-results.jsonl"
+    timeout: Option[float] = 300.0
+    model_prices: Option[str] = ""
+
+
+class RunCommand(BaseCommand[RunCommandParams]):
+    NAME = "run"
+
+    def run(self) -> None:
+        import asyncio
+
+        from .headless import run_scenarios
+        from .usage import load_model_prices, usage_ledger
+
+        prompts = self._prompts()
+        if not prompts:
+            raise click.UsageError("Pass a --prompt or a --script")
+        agent_names = {
+            name.strip() for name in self.params.agent.split(",") if name.strip()
+        }
+        output_path = Path(self.params.output)
+        if self.params.model_prices:
+            usage_ledger.configure(prices=load_model_prices(self.params.model_prices))
+
+        results = asyncio.run(
+            run_scenarios(
+                self.params.package,
+                prompts,
+                output_path,
+                agent_names=agent_names or None,
+                concurrency=self.params.concurrency,
+                timeout=self.params.timeout,
+            )
+        )
+
+        statuses = Counter(result.status for result in results)
+        summary = ", ".join(f"{count} {status}" for status, count in statuses.items())
+        click.echo(f"{len(results)} runs ({summary or 'none'}), wrote {output_path}")
+        if statuses.keys() - {"complete"}:
+            sys.exit(1)
+
+    def _prompts(self) -> list[str]:
+        prompts = [self.params.prompt] if self.params.prompt else []
+        if self.params.script:
+            # One prompt per line, run in order as turns of one conversation
+            lines = Path(self.params.script).read_text().splitlines()
+            prompts.extend(line for line in lines if line.strip())
+        return prompts
+
+
+class _CLI(Group):
+    """Runs `start` when no command is given, e.g. `playbook my_agents`."""
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args and args[0] not in self.commands and args[0] not in ("--help", "-h"):
+            args = [StartCommand.NAME, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_CLI)
+def cli(**_: Any) -> None:
+    pass
+
+
+cli.add_command_cls(StartCommand)
+cli.add_command_cls(RunCommand)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,305 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+DEFAULT_CONVERSATION_DB = Path(".agent-playbook") / "conversations.db"
+DEFAULT_PARSED_CACHE_SIZE = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    parent_id INTEGER REFERENCES messages (id),
+    depth INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation_id);
+CREATE INDEX IF NOT EXISTS messages_parent ON messages (parent_id);
+CREATE INDEX IF NOT EXISTS conversations_agent ON conversations (agent, scenario);
+"""
+
+# From a message up to the root of its conversation
+_PATH_QUERY = """
+WITH RECURSIVE path (id, parent_id, depth) AS (
+    SELECT id, parent_id, depth FROM messages WHERE id = ? AND conversation_id = ?
+    UNION ALL
+    SELECT m.id, m.parent_id, m.depth FROM messages m JOIN path p ON m.id = p.parent_id
+)
+SELECT id FROM path ORDER BY depth
+"""
+
+# Messages without children: the heads of the conversation's branches
+_BRANCHES_QUERY = """
+SELECT m.conversation_id, m.id, m.depth + 1, m.created_at FROM messages m
+WHERE m.conversation_id IN ({placeholders})
+AND NOT EXISTS (SELECT 1 FROM messages c WHERE c.parent_id = m.id)
+ORDER BY m.created_at DESC
+"""
+
+
+class UnknownConversationError(KeyError):
+    pass
+
+
+@dataclass
+class Branch:
+    """The head of a line of messages, and how long the line is."""
+
+    message_id: int
+    length: int
+    updated_at: float
+
+
+@dataclass
+class Conversation:
+    conversation_id: str
+    agent: str
+    scenario: str
+    created_at: float
+    branches: list[Branch] = field(default_factory=list)
+
+
+@dataclass
+class ConversationCursor:
+    """Where a run continues a stored conversation, moved forward as it saves."""
+
+    conversation_id: str
+    agent: str
+    # Ids of `messages`, from the root of the conversation
+    message_ids: list[int]
+    messages: list[ModelMessage]
+
+
+class ConversationStore:
+    """
+    Conversations kept in a local SQLite database as trees of messages.
+
+    Each message is stored once and points at its parent, so any message is the
+    head of a branch: forking is just continuing from an older message, and
+    branches share their common prefix. Parsed messages are cached by id, so
+    loading a branch only parses the messages not seen yet.
+
+    Calls block on SQLite; async code runs them in a thread.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_CONVERSATION_DB,
+        parsed_cache_size: int = DEFAULT_PARSED_CACHE_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self._parsed_cache_size = parsed_cache_size
+        self._parsed: OrderedDict[int, ModelMessage] = OrderedDict()
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so servers that never store a conversation (and
+        # forked workers) don't share or create the database
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def create(self, agent: str, scenario: str = "") -> Conversation:
+        conversation = Conversation(
+            conversation_id=uuid.uuid4().hex,
+            agent=agent,
+            scenario=scenario,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO conversations VALUES (?, ?, ?, ?)",
+                (
+                    conversation.conversation_id,
+                    agent,
+                    scenario,
+                    conversation.created_at,
+                ),
+            )
+        return conversation
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            deleted = connection.execute(
+                "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+            ).rowcount
+        if not deleted:
+            raise UnknownConversationError(conversation_id)
+
+    def list_conversations(
+        self, agent: str | None = None, scenario: str | None = None
+    ) -> list[Conversation]:
+        """Conversations of `agent` and `scenario` (all if None), newest first."""
+        query = "SELECT id, agent, scenario, created_at FROM conversations"
+        filters = {"agent": agent, "scenario": scenario}
+        conditions = [f"{name} = ?" for name, value in filters.items() if value]
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC"
+        params = [value for value in filters.values() if value]
+
+        with self._lock:
+            connection = self._connect()
+            conversations = {
+                row[0]: Conversation(*row)
+                for row in connection.execute(query, params).fetchall()
+            }
+            if conversations:
+                placeholders = ",".join("?" * len(conversations))
+                rows = connection.execute(
+                    _BRANCHES_QUERY.format(placeholders=placeholders),
+                    list(conversations),
+                ).fetchall()
+                for conversation_id, message_id, length, updated_at in rows:
+                    conversations[conversation_id].branches.append(
+                        Branch(message_id, length, updated_at)
+                    )
+        return list(conversations.values())
+
+    def cursor(
+        self, conversation_id: str, message_id: int | None = None
+    ) -> ConversationCursor:
+        """Start a run after `message_id`, or at the start of the conversation."""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT agent FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                raise UnknownConversationError(conversation_id)
+            agent = row[0]
+            if message_id is None:
+                return ConversationCursor(conversation_id, agent, [], [])
+
+            message_ids = [
+                row[0]
+                for row in connection.execute(
+                    _PATH_QUERY, (message_id, conversation_id)
+                ).fetchall()
+            ]
+            if not message_ids:
+                raise UnknownConversationError(f"{conversation_id}/{message_id}")
+            messages = self._parse(connection, message_ids)
+        return ConversationCursor(conversation_id, agent, message_ids, messages)
+
+    def _parse(
+        self, connection: sqlite3.Connection, message_ids: list[int]
+    ) -> list[ModelMessage]:
+        missing = [
+            message_id for message_id in message_ids if message_id not in self._parsed
+        ]
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            rows = connection.execute(
+                f"SELECT id, data FROM messages WHERE id IN ({placeholders})", missing
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            parsed = ModelMessagesTypeAdapter.validate_json(
+                "[" + ",".join(row[1] for row in rows) + "]"
+            )
+            self._parsed.update(zip(ids, parsed, strict=True))
+
+        messages = []
+        for message_id in message_ids:
+            self._parsed.move_to_end(message_id)
+            # Runs reassign fields of history messages (e.g. the parts of
+            # re-evaluated dynamic system prompts), so each gets its own copies.
+            # Their parts are shared and must not be changed in place.
+            messages.append(copy.copy(self._parsed[message_id]))
+        while len(self._parsed) > self._parsed_cache_size:
+            self._parsed.popitem(last=False)
+        return messages
+
+    def save(
+        self, cursor: ConversationCursor, messages: list[ModelMessage], keep: int
+    ) -> list[int]:
+        """
+        Store the messages of a run continuing `cursor`, and move it to them.
+
+        The first `keep` messages are the cursor's own; the rest are appended
+        after them. Returns the ids of the new messages.
+        """
+        new_messages = messages[keep:]
+        if not new_messages:
+            return []
+        data = ModelMessagesTypeAdapter.dump_python(new_messages, mode="json")
+        parent_id = cursor.message_ids[keep - 1] if keep else None
+        now = time.time()
+        new_ids: list[int] = []
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN")
+            try:
+                for depth, message in enumerate(data, start=keep):
+                    row_id = connection.execute(
+                        "INSERT INTO messages "
+                        "(conversation_id, parent_id, depth, data, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (
+                            cursor.conversation_id,
+                            parent_id,
+                            depth,
+                            json.dumps(message),
+                            now,
+                        ),
+                    ).lastrowid
+                    assert row_id is not None
+                    new_ids.append(row_id)
+                    parent_id = row_id
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self._parsed.update(zip(new_ids, map(copy.copy, new_messages), strict=True))
+
+        cursor.message_ids = [*cursor.message_ids[:keep], *new_ids]
+        cursor.messages = list(messages)
+        return new_ids
+
+
+_conversation_store: ConversationStore | None = None
+
+
+def set_conversation_store(store: ConversationStore) -> None:
+    """Store conversations in `store`, e.g. from `--conversation-db`."""
+    global _conversation_store
+    _conversation_store = store
+
+
+def get_conversation_store() -> ConversationStore:
+    global _conversation_store
+    if _conversation_store is None:
+        _conversation_store = ConversationStore()
+    return _conversation_store
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 16
+
+TDeps = TypeVar("TDeps")
+
+
+def settings_key(settings_obj: Any) -> str:
+    """Hash scenario settings so equal settings map to the same key."""
+    if isinstance(settings_obj, BaseModel):
+        data = settings_obj.model_dump(mode="json")
+    else:
+        data = settings_obj
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class _Entry(Generic[TDeps]):
+    key: str
+    deps: TDeps
+    last_used: float = field(default_factory=time.monotonic)
+    # Runs currently using the dependencies
+    leases: int = 0
+    evicted: bool = False
+
+
+class DependencyCache(Generic[TDeps]):
+    """
+    Reuse the dependencies built for identical scenario settings.
+
+    Pass one to `export(dependency_cache=...)` to call `init_dependencies_fn` once
+    per distinct settings instead of on every chat turn. Entries are evicted
+    when unused for `ttl_seconds` or when more than `max_size` are cached, and
+    `close` is awaited with the evicted dependencies once no run uses them.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl_seconds: float | None = None,
+        close: Callable[[TDeps], Awaitable[None]] | None = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._close = close
+        self._entries: OrderedDict[str, _Entry[TDeps]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float) -> list[_Entry[TDeps]]:
+        evicted: list[_Entry[TDeps]] = []
+        # Entries are kept in least-recently-used order, so expired ones are first
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            expired = (
+                self._ttl_seconds is not None
+                and now - entry.last_used >= self._ttl_seconds
+            )
+            if not expired and len(self._entries) <= self._max_size:
+                break
+            self._entries.popitem(last=False)
+            entry.evicted = True
+            evicted.append(entry)
+        return evicted
+
+    async def _close_entry(self, entry: _Entry[TDeps]) -> None:
+        if self._close is None:
+            return
+        try:
+            await self._close(entry.deps)
+        except Exception:
+            logger.exception(f"Failed to close cached dependencies '{entry.key}'")
+
+    async def _close_idle(self, entries: list[_Entry[TDeps]]) -> None:
+        # Entries still leased are closed when their last run releases them
+        for entry in entries:
+            if entry.leases == 0:
+                await self._close_entry(entry)
+
+    @asynccontextmanager
+    async def lease(
+        self, settings_obj: Any, init_fn: Callable[[Any], TDeps]
+    ) -> AsyncIterator[TDeps]:
+        """Get the dependencies for `settings_obj`, building them on a miss."""
+        now = time.monotonic()
+        key = settings_key(settings_obj)
+        # Expired entries go first, so a run after their TTL doesn't revive them
+        await self._close_idle(self._evict(now))
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry(key=key, deps=init_fn(settings_obj), last_used=now)
+            self._entries[key] = entry
+        else:
+            entry.last_used = now
+            self._entries.move_to_end(key)
+        entry.leases += 1
+        try:
+            await self._close_idle(self._evict(now))
+            yield entry.deps
+        finally:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.leases == 0:
+                await self._close_entry(entry)
+
+    async def aclose(self) -> None:
+        """Evict every entry, closing the ones no run is using."""
+        entries = list(self._entries.values())
+        self._entries.clear()
+        for entry in entries:
+            entry.evicted = True
+        await self._close_idle(entries)
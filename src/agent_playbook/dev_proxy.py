@@ -0,0 +1,92 @@
+from collections.abc import Iterable
+
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+DEV_SERVER_URL = "http://localhost:5173"
+
+# Headers that only apply to a single connection and must not be forwarded
+# (RFC 9110, section 7.6.1)
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "proxy-connection",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
+
+def _end_to_end_headers(
+    headers: Iterable[tuple[str, str]], connection: str, *exclude: str
+) -> list[tuple[str, str]]:
+    dropped = HOP_BY_HOP_HEADERS | set(exclude)
+    # Headers listed in `Connection` are hop-by-hop as well
+    dropped |= {token.strip().lower() for token in connection.split(",")}
+    return [(key, value) for key, value in headers if key.lower() not in dropped]
+
+
+class DevServerProxy:
+    """Stream requests to the Vite dev server over one pooled client."""
+
+    def __init__(
+        self,
+        base_url: str = DEV_SERVER_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(10.0, read=None),
+            transport=transport,
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def proxy(self, request: Request, path: str) -> StreamingResponse:
+        headers = _end_to_end_headers(
+            request.headers.items(), request.headers.get("connection", ""), "host"
+        )
+        has_body = (
+            "content-length" in request.headers
+            or "transfer-encoding" in request.headers
+        )
+        upstream_request = self._client.build_request(
+            method=request.method,
+            url=f"/{path}",
+            headers=headers,
+            content=request.stream() if has_body else None,
+            params=request.query_params,
+        )
+        try:
+            upstream = await self._client.send(
+                upstream_request, stream=True, follow_redirects=True
+            )
+        except httpx.RequestError as e:
+            raise HTTPException(
+                status_code=502,
+                detail=f"Dev server at {self._client.base_url} is not reachable: {e}",
+            ) from e
+
+        response = StreamingResponse(
+            # Raw bytes, so content-encoding and content-length stay valid
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            background=BackgroundTask(upstream.aclose),
+        )
+        # uvicorn sets its own `date` and `server` headers
+        for key, value in _end_to_end_headers(
+            upstream.headers.multi_items(),
+            upstream.headers.get("connection", ""),
+            "date",
+            "server",
+        ):
+            response.headers.append(key, value)
+        return response
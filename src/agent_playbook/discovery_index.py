@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+
+from ._export.export_types import GenericExportedAgent
+from .dependency_cache import settings_key
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS_SUFFIX = "__scenarios"
+INDEX_VERSION = 1
+
+
+class IndexedScenario(BaseModel):
+    name: str
+    settings: dict[str, Any]
+
+
+# Agents exported without scenarios run once, with empty settings
+NO_SCENARIO = IndexedScenario(name="", settings={})
+
+# Runs whose settings match none of their agent's scenarios, e.g. edited in the UI
+CUSTOM_SCENARIO = "custom"
+
+
+class IndexedAgent(BaseModel):
+    agent_name: str
+    module_name: str
+    scenarios: list[IndexedScenario]
+
+
+class DiscoveryIndex(BaseModel):
+    version: int = INDEX_VERSION
+    package: str
+    fingerprint: str
+    agents: list[IndexedAgent]
+
+
+def settings_data(settings_obj: Any) -> dict[str, Any]:
+    if isinstance(settings_obj, dict):
+        return settings_obj
+    if isinstance(settings_obj, BaseModel):
+        return settings_obj.model_dump()
+    raise RuntimeError(
+        f"Settings type is not supported: {settings_obj.__class__.__name__}"
+    )
+
+
+def index_agent(exported_agent: GenericExportedAgent, module_name: str) -> IndexedAgent:
+    return IndexedAgent(
+        agent_name=exported_agent.agent_name,
+        module_name=module_name,
+        scenarios=[
+            IndexedScenario(
+                name=scenario["name"],
+                settings=settings_data(scenario.get("settings", {})),
+            )
+            for scenario in exported_agent.scenarios
+        ],
+    )
+
+
+def scenario_label(exported_agent: GenericExportedAgent, settings: Any) -> str:
+    """
+    The scenario a run with `settings` is reported under in metrics and usage.
+
+    Runs of agents without scenarios use the name of `NO_SCENARIO`, like the
+    matrix and headless runs; any settings that match no scenario share
+    `CUSTOM_SCENARIO`, which keeps the number of labels bounded.
+    """
+    key = settings_key(settings)
+    scenarios = [
+        (scenario["name"], scenario.get("settings", {}))
+        for scenario in exported_agent.scenarios
+    ] or [(NO_SCENARIO.name, NO_SCENARIO.settings)]
+    for name, scenario_settings in scenarios:
+        if settings_key(scenario_settings) == key:
+            return name
+    return CUSTOM_SCENARIO
+
+
+def _walk_package(path: Path, prefix: str) -> Iterator[tuple[str, Path]]:
+    # Like pkgutil.walk_packages, but reads the file system instead of importing
+    # every subpackage to find its __path__
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if entry.name.startswith((".", "__pycache__")):
+            continue
+        if entry.is_dir():
+            init_file = Path(entry.path) / "__init__.py"
+            if init_file.exists():
+                yield f"{prefix}{entry.name}", init_file
+                yield from _walk_package(Path(entry.path), f"{prefix}{entry.name}.")
+        elif entry.name.endswith(".py") and entry.name != "__init__.py":
+            yield f"{prefix}{entry.name.removesuffix('.py')}", Path(entry.path)
+
+
+def package_modules(package_paths: list[str], package: str) -> list[tuple[str, Path]]:
+    """List the module names and files of a package without importing it."""
+    modules: list[tuple[str, Path]] = []
+    for package_path in package_paths:
+        init_file = Path(package_path) / "__init__.py"
+        if init_file.exists():
+            modules.append((package, init_file))
+        modules.extend(_walk_package(Path(package_path), f"{package}."))
+    return modules
+
+
+def scan_package(package_paths: list[str], package: str) -> tuple[str, list[str]]:
+    """
+    Find the scenario modules of a package without importing anything.
+
+    Returns a fingerprint of every module file (path, mtime and size) along with
+    the names of the `__scenarios` modules.
+    """
+    fingerprint = hashlib.sha256()
+    scenario_modules: list[str] = []
+    for module_name, path in package_modules(package_paths, package):
+        stat = path.stat()
+        fingerprint.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+        if module_name.endswith(SCENARIOS_SUFFIX):
+            scenario_modules.append(module_name)
+    return fingerprint.hexdigest(), scenario_modules
+
+
+def _index_path(package: str, package_paths: list[str]) -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    location = os.pathsep.join(package_paths)
+    location_hash = hashlib.sha256(location.encode()).hexdigest()[:16]
+    return Path(cache_home) / "agent-playbook" / f"{package}-{location_hash}.json"
+
+
+def read_index(
+    package: str, package_paths: list[str], fingerprint: str
+) -> DiscoveryIndex | None:
+    path = _index_path(package, package_paths)
+    try:
+        index = DiscoveryIndex.model_validate_json(path.read_bytes())
+    except (OSError, ValidationError):
+        return None
+    if index.version != INDEX_VERSION or index.fingerprint != fingerprint:
+        return None
+    return index
+
+
+def write_index(index: DiscoveryIndex, package_paths: list[str]) -> None:
+    path = _index_path(index.package, package_paths)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(index.model_dump_json())
+        tmp_path.replace(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to write discovery index to {path}: {e}")
+        tmp_path.unlink(missing_ok=True)
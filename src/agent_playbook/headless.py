@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from .agent_loader import agent_loader
+from .api import stream_agent_events
+from .discovery_index import NO_SCENARIO
+from .sessions import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT_SECONDS = 300.0
+
+RunStatus = Literal["complete", "pending_approval", "error", "timeout"]
+
+
+class TurnResult(BaseModel):
+    prompt: str
+    output: str = ""
+    tool_calls: list[str] = []
+    status: RunStatus = "complete"
+    error: str | None = None
+    first_delta_ms: float | None = None
+    duration_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float | None = None
+
+
+class RunResult(BaseModel):
+    agent: str
+    scenario: str
+    status: RunStatus = "complete"
+    turns: list[TurnResult] = []
+    duration_ms: float = 0.0
+
+
+async def _run_turn(
+    agent_name: str,
+    scenario_name: str,
+    prompt: str,
+    settings: dict[str, Any],
+    session: Session,
+) -> TurnResult:
+    turn = TurnResult(prompt=prompt)
+    output: list[str] = []
+    start = time.perf_counter()
+    async for event in stream_agent_events(
+        agent_name,
+        prompt,
+        session.messages,
+        settings,
+        "auto",
+        session=session,
+        history_mode="delta",
+        scenario=scenario_name,
+    ):
+        if event.type == "text_delta":
+            if turn.first_delta_ms is None:
+                turn.first_delta_ms = (time.perf_counter() - start) * 1000
+            output.append(event.delta)
+        elif event.type == "tool_call_executing":
+            turn.tool_calls.append(event.tool_name)
+        elif event.type == "usage":
+            turn.input_tokens = event.input_tokens
+            turn.output_tokens = event.output_tokens
+            turn.cost = event.cost
+        elif event.type == "error":
+            turn.status = "error"
+            turn.error = event.error
+        elif event.type == "done" and turn.status != "error":
+            turn.status = event.status
+    turn.output = "".join(output)
+    turn.duration_ms = (time.perf_counter() - start) * 1000
+    return turn
+
+
+async def _run_scenario(
+    agent_name: str,
+    scenario_name: str,
+    settings: dict[str, Any],
+    prompts: list[str],
+    timeout: float,
+) -> RunResult:
+    result = RunResult(agent=agent_name, scenario=scenario_name)
+    session = Session(session_id=f"{agent_name}/{scenario_name}")
+    start = time.perf_counter()
+
+    async def run_turns() -> None:
+        for prompt in prompts:
+            turn = await _run_turn(agent_name, scenario_name, prompt, settings, session)
+            result.turns.append(turn)
+            if turn.status != "complete":
+                # Later turns can't continue an errored or paused conversation
+                result.status = turn.status
+                return
+
+    try:
+        await asyncio.wait_for(run_turns(), timeout)
+    except asyncio.TimeoutError:
+        result.status = "timeout"
+    except Exception as e:
+        # e.g. the scenario settings don't validate
+        result.status = "error"
+        result.turns.append(TurnResult(prompt="", status="error", error=str(e)))
+    result.duration_ms = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def run_scenarios(
+    package: str,
+    prompts: list[str],
+    output_path: Path,
+    agent_names: set[str] | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+) -> list[RunResult]:
+    """
+    Run `prompts` as one conversation against every scenario of every agent.
+
+    At most `concurrency` conversations run at once. Each result is appended to
+    `output_path` as a JSON line as soon as its conversation ends.
+    """
+    agent_loader.load(package)
+    runs = [
+        (indexed_agent.agent_name, scenario.name, scenario.settings)
+        for indexed_agent in agent_loader.list_agents()
+        if agent_names is None or indexed_agent.agent_name in agent_names
+        for scenario in indexed_agent.scenarios or [NO_SCENARIO]
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[RunResult] = []
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("w") as output:
+
+        async def run(agent_name: str, scenario: str, settings: dict[str, Any]) -> None:
+            async with semaphore:
+                result = await _run_scenario(
+                    agent_name, scenario, settings, prompts, timeout
+                )
+            results.append(result)
+            output.write(result.model_dump_json() + "\n")
+            output.flush()
+            logger.info(
+                f"{agent_name} / {scenario}: {result.status} "
+                f"in {result.duration_ms:.0f}ms"
+            )
+
+        await asyncio.gather(*(run(*args) for args in runs))
+    return results
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import time
+from collections.abc import (
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Sequence,
+)
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import FallbackExceptionGroup
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    ModelResponseStreamEvent,
+)
+from pydantic_ai.models import (
+    KnownModelName,
+    Model,
+    ModelRequestParameters,
+    StreamedResponse,
+    infer_model,
+)
+from pydantic_ai.settings import ModelSettings
+
+from .wrapped_stream import WrappedStreamedResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY_SECONDS = 1.0
+
+T = TypeVar("T")
+
+# An attempt calls its report function once it has a first result
+_Attempt = Callable[[Callable[[T], None]], Coroutine[Any, Any, None]]
+
+# A model's stream, its events and the first of them (None if it had none)
+_FirstEvent = tuple[
+    StreamedResponse,
+    AsyncIterator[ModelResponseStreamEvent],
+    ModelResponseStreamEvent | None,
+]
+
+
+@dataclass
+class _RacedStreamedResponse(WrappedStreamedResponse):
+    """The stream of the model that won a race, with the event that decided it."""
+
+    events: AsyncIterator[ModelResponseStreamEvent] = field(kw_only=True)
+    first_event: ModelResponseStreamEvent | None = field(kw_only=True)
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        if self.first_event is not None:
+            yield self.first_event
+        async for event in self.events:
+            yield event
+
+
+@dataclass
+class ModelRace:
+    """How a hedged model request was decided."""
+
+    # `system:model_name` of the model that answered first
+    winner: str
+    # Position of the winner in the hedged models, 0 for the primary
+    index: int
+    # Number of models started for the request, the winner included
+    started: int
+    first_event_ms: float
+
+
+# Called with the outcome of every race of the current run, see `set_race_listener`
+_race_listener: ContextVar[Callable[[ModelRace], None] | None] = ContextVar(
+    "_race_listener", default=None
+)
+
+
+def set_race_listener(listener: Callable[[ModelRace], None]) -> None:
+    """Report the races of hedged models in the current context to `listener`."""
+    _race_listener.set(listener)
+
+
+@dataclass(init=False)
+class HedgedModel(Model):
+    """
+    A model racing a primary model against backups, to cut tail latency.
+
+    Each request starts on the primary model; whenever `hedge_delay` seconds go
+    by without any started model producing its first event (or a started model
+    fails before producing one), the next backup is started alongside. The first
+    model to produce an event answers the request and the others are cancelled.
+
+    Races are decided per model request, so a run whose tools are called between
+    requests never calls them twice.
+    """
+
+    models: list[Model]
+    hedge_delay: float
+
+    def __init__(
+        self,
+        primary_model: Model | KnownModelName | str,
+        *backup_models: Model | KnownModelName | str,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY_SECONDS,
+    ) -> None:
+        super().__init__()
+        if hedge_delay < 0:
+            raise ValueError("hedge_delay must not be negative")
+        self.models = [infer_model(primary_model), *map(infer_model, backup_models)]
+        self.hedge_delay = hedge_delay
+
+    @property
+    def model_name(self) -> str:
+        return ",".join(f"{model.system}:{model.model_name}" for model in self.models)
+
+    @property
+    def system(self) -> str:
+        return "hedged"
+
+    @property
+    def base_url(self) -> str | None:
+        return self.models[0].base_url
+
+    async def _race(
+        self, attempts: Sequence[_Attempt[T]]
+    ) -> tuple[T, asyncio.Task[None]]:
+        """
+        Run `attempts` in order, starting each once the previous ones are late.
+
+        Returns the result of the first attempt to report, with its task; the
+        other attempts are cancelled.
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        winner: asyncio.Future[tuple[int, T]] = loop.create_future()
+        tasks: list[asyncio.Task[None]] = []
+        errors: list[Exception] = []
+
+        def start_next() -> None:
+            index = len(tasks)
+
+            def report(result: T) -> None:
+                if not winner.done():
+                    winner.set_result((index, result))
+
+            tasks.append(asyncio.create_task(attempts[index](report)))
+
+        start_next()
+        try:
+            while not winner.done():
+                running = [task for task in tasks if not task.done()]
+                can_hedge = len(tasks) < len(attempts)
+                if not running and not can_hedge:
+                    raise FallbackExceptionGroup(
+                        "All models from HedgedModel failed", errors
+                    )
+                waiting: list[asyncio.Future[Any]] = [winner, *running]
+                done, _ = await asyncio.wait(
+                    waiting,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if winner.done():
+                    break
+                for task in done:
+                    error = None if task.cancelled() else task.exception()
+                    if isinstance(error, Exception):
+                        logger.debug(f"Hedged model attempt failed: {error!r}")
+                        errors.append(error)
+                if can_hedge:
+                    # Late or failed: either way, the next model gets its chance
+                    start_next()
+        finally:
+            winning_task = tasks[winner.result()[0]] if winner.done() else None
+            losers = [t for t in tasks if t is not winning_task and not t.done()]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+        index, result = winner.result()
+        self._report(index, len(tasks), start)
+        return result, tasks[index]
+
+    def _report(self, index: int, started: int, start: float) -> None:
+        model = self.models[index]
+        race = ModelRace(
+            winner=f"{model.system}:{model.model_name}",
+            index=index,
+            started=started,
+            first_event_ms=(time.perf_counter() - start) * 1000,
+        )
+        if index:
+            logger.info(
+                f"Backup model '{race.winner}' answered before the primary "
+                f"({race.first_event_ms:.0f} ms)"
+            )
+        listener = _race_listener.get()
+        if listener is not None:
+            listener(race)
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        def attempt(model: Model) -> _Attempt[ModelResponse]:
+            async def run(report: Callable[[ModelResponse], None]) -> None:
+                report(
+                    await model.request(
+                        messages, model_settings, model_request_parameters
+                    )
+                )
+
+            return run
+
+        response, _ = await self._race([attempt(model) for model in self.models])
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        # Each model's stream is entered and exited in its own task; the winner's
+        # stays open until the caller is done with the response
+        released = asyncio.Event()
+
+        def attempt(model: Model) -> _Attempt[_FirstEvent]:
+            async def run(report: Callable[[_FirstEvent], None]) -> None:
+                async with model.request_stream(
+                    messages, model_settings, model_request_parameters, run_context
+                ) as response:
+                    # Part end and final result events are derived by the
+                    # raced stream, so the winner's are taken before them
+                    events = response._get_event_iterator()
+                    first = await anext(events, None)
+                    report((response, events, first))
+                    await released.wait()
+
+            return run
+
+        (response, events, first), task = await self._race(
+            [attempt(model) for model in self.models]
+        )
+
+        try:
+            # The first event was taken to decide the race; it is put back in front
+            yield _RacedStreamedResponse(
+                model_request_parameters=response.model_request_parameters,
+                wrapped=response,
+                events=events,
+                first_event=first,
+            )
+        finally:
+            released.set()
+            await task
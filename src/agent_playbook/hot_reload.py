@@ -0,0 +1,182 @@
+import ast
+import asyncio
+import importlib.util
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from .agent_loader import agent_loader
+from .dependency_cache import DependencyCache
+from .discovery_index import SCENARIOS_SUFFIX, package_modules
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+FileState = tuple[int, int]
+
+
+def _module_imports(module_name: str, path: Path) -> set[str]:
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (OSError, SyntaxError):
+        return set()
+
+    is_package = path.name == "__init__.py"
+    parent = module_name if is_package else module_name.rpartition(".")[0]
+    imports: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            try:
+                base = importlib.util.resolve_name(
+                    "." * node.level + (node.module or ""), parent
+                )
+            except ImportError:
+                continue
+            imports.add(base)
+            # `from package import module` imports a submodule
+            imports.update(f"{base}.{alias.name}" for alias in node.names)
+    return imports
+
+
+def _dependency_caches() -> list[DependencyCache[Any]]:
+    return [
+        exported_agent.dependency_cache
+        for exported_agent in agent_loader.loaded_agents()
+        if exported_agent.dependency_cache is not None
+    ]
+
+
+class HotReloader:
+    """
+    Watch a package and reload only the modules affected by a file change.
+
+    A change to a module reloads it along with every module of the package that
+    imports it, directly or not, so `__scenarios` modules pick up changes to the
+    agents they export.
+    """
+
+    def __init__(
+        self, package: str, poll_interval: float = DEFAULT_POLL_INTERVAL
+    ) -> None:
+        self._package = package
+        self._poll_interval = poll_interval
+        # Parsed imports of each module, until its file changes
+        self._imports: dict[str, tuple[FileState, set[str]]] = {}
+
+    def _snapshot(self) -> dict[str, tuple[Path, FileState]]:
+        package_paths = list(sys.modules[self._package].__path__)
+        snapshot: dict[str, tuple[Path, FileState]] = {}
+        for module_name, path in package_modules(package_paths, self._package):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[module_name] = (path, (stat.st_mtime_ns, stat.st_size))
+        return snapshot
+
+    def _import_graph(
+        self, snapshot: dict[str, tuple[Path, FileState]]
+    ) -> dict[str, set[str]]:
+        """The package modules imported by each module of `snapshot`."""
+        graph: dict[str, set[str]] = {}
+        cached = self._imports
+        self._imports = {}
+        for module_name, (path, state) in snapshot.items():
+            entry = cached.get(module_name)
+            if entry is None or entry[0] != state:
+                entry = (state, _module_imports(module_name, path))
+            self._imports[module_name] = entry
+            graph[module_name] = entry[1] & snapshot.keys()
+        return graph
+
+    def _affected_modules(
+        self, changed: set[str], snapshot: dict[str, tuple[Path, FileState]]
+    ) -> list[str]:
+        imports = self._import_graph(snapshot)
+
+        affected = set(changed)
+        pending = list(changed)
+        while pending:
+            module_name = pending.pop()
+            for importer, imported in imports.items():
+                if module_name in imported and importer not in affected:
+                    affected.add(importer)
+                    pending.append(importer)
+
+        # Reload dependencies before the modules importing them
+        ordered: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(module_name: str) -> None:
+            if module_name in visiting or module_name in ordered:
+                return
+            visiting.add(module_name)
+            for imported in sorted(imports.get(module_name, ())):
+                if imported in affected:
+                    visit(imported)
+            ordered.append(module_name)
+
+        for module_name in sorted(affected):
+            visit(module_name)
+
+        # Modules that were never imported don't need a reload, except scenario
+        # modules, which are imported to pick up the agents they export
+        return [
+            module_name
+            for module_name in ordered
+            if module_name in snapshot
+            and (module_name in sys.modules or module_name.endswith(SCENARIOS_SUFFIX))
+        ]
+
+    def _reload(
+        self, module_names: list[str], removed: set[str]
+    ) -> list[DependencyCache[Any]]:
+        """Reload `module_names` and return the caches of replaced agents."""
+        caches = _dependency_caches()
+        start = time.perf_counter()
+        try:
+            agent_names = agent_loader.reload_modules(module_names, removed)
+        except Exception:
+            logger.exception(
+                f"Hot reload of {', '.join(module_names)} failed, keeping the "
+                f"previous agents"
+            )
+            return []
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Hot reloaded {len(module_names)} modules in {elapsed_ms:.1f}ms "
+            f"(agents: {', '.join(agent_names) or 'none'})"
+        )
+        kept = _dependency_caches()
+        return [cache for cache in caches if cache not in kept]
+
+    async def run(self) -> None:
+        # Walking the package and parsing modules is file IO, kept off the event
+        # loop; only the reload itself runs on it
+        snapshot = await asyncio.to_thread(self._snapshot)
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            new_snapshot = await asyncio.to_thread(self._snapshot)
+            changed = {
+                module_name
+                for module_name in snapshot.keys() | new_snapshot.keys()
+                if snapshot.get(module_name) != new_snapshot.get(module_name)
+            }
+            snapshot = new_snapshot
+            if changed:
+                removed = {
+                    module_name
+                    for module_name in changed
+                    if module_name not in snapshot
+                }
+                module_names = await asyncio.to_thread(
+                    self._affected_modules, changed - removed, snapshot
+                )
+                for cache in self._reload(module_names, removed):
+                    await cache.aclose()
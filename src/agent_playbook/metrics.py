@@ -0,0 +1,276 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+
+from .types import StreamEventType
+
+# Seconds, from fast local models up to long multi-tool runs
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+RUN_LABELS = ("agent", "scenario", "model")
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class _Metric(ABC):
+    TYPE = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]: ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str]) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def dec(self, labels: LabelValues, amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self._buckets = tuple(buckets)
+        # Per label values: the count of each bucket (not cumulative) and the sum
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = ([0] * (len(self._buckets) + 1), [0.0])
+            self._series[labels] = series
+        counts, total = series
+        counts[bisect_left(self._buckets, value)] += 1
+        total[0] += value
+
+    def _samples(self) -> Iterable[str]:
+        bucket_labels = (*self.labels, "le")
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(
+                (*(str(b) for b in self._buckets), "+Inf"), counts, strict=True
+            ):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket"
+                    f"{_format_labels(bucket_labels, (*labels, bound))} {cumulative}"
+                )
+            formatted = _format_labels(self.labels, labels)
+            yield f"{self.name}_sum{formatted} {total[0]}"
+            yield f"{self.name}_count{formatted} {cumulative}"
+
+
+class _Metrics:
+    def __init__(self) -> None:
+        self.runs_in_flight = Gauge(
+            "playbook_runs_in_flight",
+            "Agent runs admitted and currently streaming.",
+            RUN_LABELS,
+        )
+        self.runs_queued = Gauge(
+            "playbook_runs_queued",
+            "Agent runs waiting for a slot under their agent or model limit.",
+            RUN_LABELS,
+        )
+        self.queue_wait = Histogram(
+            "playbook_queue_wait_seconds",
+            "Time runs spent queued before starting.",
+            RUN_LABELS,
+        )
+        self.runs = Counter(
+            "playbook_runs_total",
+            "Finished agent runs, by final status.",
+            (*RUN_LABELS, "status"),
+        )
+        self.run_errors = Counter(
+            "playbook_run_errors_total", "Agent runs that failed.", RUN_LABELS
+        )
+        self.time_to_first_token = Histogram(
+            "playbook_time_to_first_token_seconds",
+            "Time from the start of a run to its first text or thinking delta.",
+            RUN_LABELS,
+        )
+        self.run_duration = Histogram(
+            "playbook_run_duration_seconds", "Duration of agent runs.", RUN_LABELS
+        )
+        self.tool_call_duration = Histogram(
+            "playbook_tool_call_duration_seconds",
+            "Time from a tool call to its result.",
+            ("agent", "tool"),
+        )
+        self.model_races = Counter(
+            "playbook_model_races_total",
+            "Requests of hedged models, by the model that answered first.",
+            (*RUN_LABELS, "winner"),
+        )
+        self.tokens = Counter(
+            "playbook_tokens_total",
+            "Tokens used by finished agent runs, by direction.",
+            (*RUN_LABELS, "direction"),
+        )
+        self.cost = Counter(
+            "playbook_cost_dollars_total",
+            "Cost of finished agent runs, for models with a price.",
+            RUN_LABELS,
+        )
+        self.events_streamed = Counter(
+            "playbook_stream_events_total",
+            "Events streamed to /api/chat clients.",
+            (*RUN_LABELS, "type"),
+        )
+        self.bytes_streamed = Counter(
+            "playbook_stream_bytes_total",
+            "Bytes streamed to /api/chat clients.",
+            RUN_LABELS,
+        )
+        self._all: list[_Metric] = [
+            self.runs_in_flight,
+            self.runs_queued,
+            self.queue_wait,
+            self.runs,
+            self.run_errors,
+            self.time_to_first_token,
+            self.run_duration,
+            self.tool_call_duration,
+            self.model_races,
+            self.tokens,
+            self.cost,
+            self.events_streamed,
+            self.bytes_streamed,
+        ]
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._all) + "\n"
+
+
+metrics = _Metrics()
+
+
+class RunMetrics:
+    """Record the metrics of one agent run from the events it streams."""
+
+    def __init__(self) -> None:
+        self._labels: LabelValues = ("", "", "")
+        self._agent = ""
+        self._start = 0.0
+        self._first_token = False
+        self._queued_since: float | None = None
+        self._admitted = False
+        self._tool_calls: dict[str, tuple[str, float]] = {}
+        self.status = ""
+
+    def start(self, agent: str, scenario: str, model: str) -> None:
+        self._labels = (agent, scenario, model)
+        self._agent = agent
+        self._start = time.perf_counter()
+
+    def queued(self) -> None:
+        if self._queued_since is None:
+            self._queued_since = time.perf_counter()
+            metrics.runs_queued.inc(self._labels)
+
+    def admitted(self) -> None:
+        self._leave_queue()
+        if not self._admitted:
+            self._admitted = True
+            metrics.runs_in_flight.inc(self._labels)
+
+    def _leave_queue(self) -> None:
+        if self._queued_since is not None:
+            metrics.runs_queued.dec(self._labels)
+            metrics.queue_wait.observe(
+                self._labels, time.perf_counter() - self._queued_since
+            )
+            self._queued_since = None
+
+    def observe(self, event: StreamEventType) -> None:
+        if event.type == "text_delta" or event.type == "thinking_delta":
+            if not self._first_token:
+                self._first_token = True
+                metrics.time_to_first_token.observe(
+                    self._labels, time.perf_counter() - self._start
+                )
+        elif event.type == "tool_call_executing":
+            self._tool_calls[event.tool_call_id] = (
+                event.tool_name,
+                time.perf_counter(),
+            )
+        elif event.type == "tool_result":
+            tool_call = self._tool_calls.pop(event.tool_call_id, None)
+            if tool_call is not None:
+                tool_name, started = tool_call
+                metrics.tool_call_duration.observe(
+                    (self._agent, tool_name), time.perf_counter() - started
+                )
+        elif event.type == "model_race":
+            metrics.model_races.inc((*self._labels, event.winner))
+        elif event.type == "usage":
+            metrics.tokens.inc((*self._labels, "input"), event.input_tokens)
+            metrics.tokens.inc((*self._labels, "output"), event.output_tokens)
+            if event.cost is not None:
+                metrics.cost.inc(self._labels, event.cost)
+        elif event.type == "error":
+            self.status = "error"
+            metrics.run_errors.inc(self._labels)
+        elif event.type == "done" and self.status != "error":
+            self.status = event.status
+
+    def streamed(self, event: StreamEventType, size: int) -> None:
+        metrics.events_streamed.inc((*self._labels, event.type))
+        metrics.bytes_streamed.inc(self._labels, size)
+
+    def finish(self) -> None:
+        self._leave_queue()
+        # Runs abandoned in the queue were never in flight
+        if self._admitted:
+            metrics.runs_in_flight.dec(self._labels)
+        metrics.run_duration.observe(self._labels, time.perf_counter() - self._start)
+        # A run that never reached `done` was abandoned, e.g. its client left
+        metrics.runs.inc((*self._labels, self.status or "incomplete"))
@@ -0,0 +1,84 @@
+import contextlib
+import gc
+import logging
+import os
+import signal
+import time
+from types import FrameType
+
+import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+
+def can_prefork() -> bool:
+    return hasattr(os, "fork")
+
+
+def serve_prefork(config: uvicorn.Config, workers: int) -> None:
+    """
+    Serve `config` from `workers` forked processes sharing one listening socket.
+
+    Everything imported before this call (the app and the loaded agents) is
+    shared copy-on-write with the workers instead of being imported per worker.
+    A worker that crashes is replaced by a new one forked from the parent.
+    """
+    config.load()
+    sock = config.bind_socket()
+    # Keep the preloaded objects out of the GC's reach so collections in the
+    # workers don't touch (and copy) their pages
+    gc.freeze()
+
+    def fork_worker() -> int:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            except BaseException:
+                logger.exception("Worker crashed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = time.monotonic()
+        return pid
+
+    # Worker pids and when they were started
+    children: dict[int, float] = {}
+    for _ in range(workers):
+        fork_worker()
+
+    logger.info(f"Started parent process [{os.getpid()}] with {workers} workers")
+
+    stopping = False
+
+    def forward_signal(signum: int, _: FrameType | None) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signum)
+
+    # Ctrl+C already reaches the workers through the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, forward_signal)
+
+    while children:
+        pid, status = os.wait()
+        started = children.pop(pid, None)
+        exit_code = os.waitstatus_to_exitcode(status)
+        # Workers stopped by a signal we forwarded (or Ctrl+C) exit cleanly
+        if started is None or stopping or exit_code == 0:
+            continue
+        logger.warning(
+            f"Worker [{pid}] exited with status {exit_code}, starting a new one"
+        )
+        # Don't spin when workers crash right away, e.g. on a broken agent
+        if time.monotonic() - started < RESPAWN_DELAY_SECONDS:
+            time.sleep(RESPAWN_DELAY_SECONDS)
+        if not stopping:
+            fork_worker()
+    sock.close()
+    logger.info(f"Stopped parent process [{os.getpid()}]")
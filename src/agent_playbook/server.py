@@ -1,14 +1,25 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncIterator
 
-import httpx
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 
+from agent_playbook.admission import admission_control
 from agent_playbook.agent_loader import agent_loader
 from agent_playbook.api import api_router
+from agent_playbook.cassette import DEFAULT_CASSETTE_DIR, Cassette, set_default_cassette
+from agent_playbook.conversations import (
+    ConversationStore,
+    get_conversation_store,
+    set_conversation_store,
+)
+from agent_playbook.hot_reload import HotReloader
+from agent_playbook.static_files import PrecompressedStaticFiles
+from agent_playbook.usage import load_model_prices, usage_ledger
 
 from .cli import StartCommandParams
 
@@ -16,12 +27,57 @@ static_dir = Path(__file__).parent / "static"
 
 START_SERVER_CONFIG = StartCommandParams.from_env_vars()
 
+dev_proxy: "DevServerProxy | None" = None
+if START_SERVER_CONFIG.dev:
+    # httpx is only needed to proxy the Vite dev server
+    from agent_playbook.dev_proxy import DevServerProxy
+
+    dev_proxy = DevServerProxy()
+
+
+async def _cancel(task: asyncio.Task[None]) -> None:
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+async def _close_dependency_caches() -> None:
+    for exported_agent in agent_loader.loaded_agents():
+        if exported_agent.dependency_cache is not None:
+            await exported_agent.dependency_cache.aclose()
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     assert START_SERVER_CONFIG.package
     agent_loader.load(START_SERVER_CONFIG.package)
-    yield
+    if START_SERVER_CONFIG.cassette is not None:
+        set_default_cassette(
+            Cassette(
+                path=START_SERVER_CONFIG.cassette_dir or DEFAULT_CASSETTE_DIR,
+                mode=START_SERVER_CONFIG.cassette,
+                speed=START_SERVER_CONFIG.cassette_speed,
+            )
+        )
+    if START_SERVER_CONFIG.conversation_db:
+        set_conversation_store(ConversationStore(START_SERVER_CONFIG.conversation_db))
+    if START_SERVER_CONFIG.model_prices:
+        usage_ledger.configure(
+            prices=load_model_prices(START_SERVER_CONFIG.model_prices)
+        )
+    admission_control.configure(
+        max_runs_per_agent=START_SERVER_CONFIG.max_runs_per_agent or None,
+        max_runs_per_model=START_SERVER_CONFIG.max_runs_per_model or None,
+    )
+    async with contextlib.AsyncExitStack() as stack:
+        stack.push_async_callback(_close_dependency_caches)
+        stack.callback(get_conversation_store().close)
+        if dev_proxy is not None:
+            stack.push_async_callback(dev_proxy.aclose)
+        if START_SERVER_CONFIG.hot_reload:
+            reloader = HotReloader(START_SERVER_CONFIG.package)
+            stack.push_async_callback(_cancel, asyncio.create_task(reloader.run()))
+        yield
 
 
 app = FastAPI(title="Agent Playbook", lifespan=lifespan)
@@ -36,32 +92,16 @@ app.add_middleware(
 
 app.include_router(api_router)
 
-if not START_SERVER_CONFIG.dev:
-    app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+if dev_proxy is None:
+    app.mount(
+        "/", PrecompressedStaticFiles(directory=static_dir, html=True), name="static"
+    )
 else:
-    DEV_SERVER_URL = "http://localhost:5173"
 
     @app.api_route(
         "/{path:path}",
         methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"],
     )
-    async def proxy_to_dev_server(request: Request, path: str) -> Response:
-        async with httpx.AsyncClient() as client:
-            url = f"{DEV_SERVER_URL}/{path}"
-            headers = dict(request.headers)
-            headers.pop("host", None)
-
-            response = await client.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                content=await request.body(),
-                params=request.query_params,
-                follow_redirects=True,
-            )
-
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-            )
+    async def proxy_to_dev_server(request: Request, path: str) -> StreamingResponse:
+        assert dev_proxy is not None
+        return await dev_proxy.proxy(request, path)
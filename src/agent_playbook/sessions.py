@@ -0,0 +1,61 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pydantic_ai.messages import ModelMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_SESSION_TTL_SECONDS = 60 * 60
+
+
+@dataclass
+class Session:
+    session_id: str
+    messages: list[ModelMessage] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class _SessionStore:
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self._max_sessions = max_sessions
+        self._ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def _evict_expired(self, now: float) -> None:
+        # Sessions are kept in least-recently-used order, so expired ones are first
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self._ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            logger.debug(f"Session '{session.session_id}' expired")
+
+    def get(self, session_id: str) -> Session | None:
+        now = time.monotonic()
+        self._evict_expired(now)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def reset(self, session_id: str) -> Session:
+        now = time.monotonic()
+        self._evict_expired(now)
+        session = Session(session_id=session_id, last_used=now)
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self._max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            logger.debug(f"Session '{evicted_id}' evicted")
+        return session
+
+
+session_store = _SessionStore()
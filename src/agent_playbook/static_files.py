@@ -0,0 +1,101 @@
+import contextlib
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Preferred first: the smallest variant the client accepts wins
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Vite puts the files named after their content hash in `assets/`
+HASHED_ASSETS_DIR = "assets"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_Variant = tuple[str, os.stat_result]
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Static files served with the `.br`/`.gz` variants written by `scripts/build.py`.
+
+    The variant the client accepts is sent as is, so nothing is compressed while
+    serving. Hashed assets are cached for good, other files (`index.html`) are
+    revalidated with their ETag on every use.
+    """
+
+    def __init__(self, *, directory: str | os.PathLike[str], html: bool = False):
+        super().__init__(directory=directory, html=html)
+        self._hashed_dir = os.path.join(os.path.realpath(directory), HASHED_ASSETS_DIR)
+        self._variants: dict[str, dict[str, _Variant]] = {}
+
+    def _variants_of(self, full_path: str) -> dict[str, _Variant]:
+        # The build output doesn't change while the server runs
+        variants = self._variants.get(full_path)
+        if variants is None:
+            variants = {}
+            for encoding, suffix in _ENCODINGS:
+                with contextlib.suppress(OSError):
+                    variants[encoding] = (
+                        full_path + suffix,
+                        os.stat(full_path + suffix),
+                    )
+            self._variants[full_path] = variants
+        return variants
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        full_path = os.fspath(full_path)
+        request_headers = Headers(scope=scope)
+        hashed = os.path.realpath(full_path).startswith(self._hashed_dir + os.sep)
+        headers = {"Cache-Control": IMMUTABLE if hashed else REVALIDATE}
+
+        variants = self._variants_of(full_path)
+        if variants:
+            headers["Vary"] = "Accept-Encoding"
+        accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        encoding = next(
+            (e for e, _ in _ENCODINGS if e in variants and e in accepted), None
+        )
+
+        if encoding is None:
+            response = FileResponse(
+                full_path, status_code, headers, stat_result=stat_result
+            )
+        else:
+            variant_path, variant_stat = variants[encoding]
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(
+                variant_path,
+                status_code,
+                headers,
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                stat_result=variant_stat,
+            )
+        # Each variant has its own ETag, so a cached one is only revalidated as is
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
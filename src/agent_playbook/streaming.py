@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+from collections.abc import Mapping
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, TypeVar
+
+from .types import StreamEventType, TextDeltaEvent, ThinkingDeltaEvent
+
+DEFAULT_FLUSH_MS = 16.0
+DEFAULT_FLUSH_SIZE = 4096
+# Bounds of the flush settings clients may ask for
+MAX_FLUSH_MS = 1000.0
+MAX_FLUSH_SIZE = 65_536
+# Events read ahead of a slow client; past that, the source waits for it
+MAX_PENDING_EVENTS = 64
+
+DeltaEventType = TextDeltaEvent | ThinkingDeltaEvent
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+
+@dataclass
+class _Failure:
+    error: Exception
+
+
+class _End:
+    pass
+
+
+async def coalesce_deltas(
+    events: AsyncIterator[StreamEventType],
+    flush_ms: float = DEFAULT_FLUSH_MS,
+    flush_size: int = DEFAULT_FLUSH_SIZE,
+) -> AsyncGenerator[StreamEventType, None]:
+    """
+    Merge consecutive text/thinking deltas of the same type into one event.
+
+    Buffered deltas are flushed once they are `flush_ms` old or hold `flush_size`
+    characters, and before any other event so ordering is kept. A non-positive
+    `flush_ms` disables coalescing.
+    """
+    if flush_ms <= 0:
+        async for event in events:
+            yield event
+        return
+
+    # The source is consumed by a single task, so context variables set inside
+    # it (e.g. agent overrides) stay in one context while we wait with timeouts.
+    # Bounded, so a slow client slows the source down instead of the whole run
+    # piling up in memory.
+    queue: asyncio.Queue[StreamEventType | _Failure | _End] = asyncio.Queue(
+        maxsize=MAX_PENDING_EVENTS
+    )
+
+    async def produce() -> None:
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(_Failure(e))
+            return
+        # Not when cancelled: nobody would take it off a full queue
+        await queue.put(_End())
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+    buffer: list[str] = []
+    buffer_type: type[DeltaEventType] = TextDeltaEvent
+    buffer_size = 0
+    deadline = 0.0
+
+    def flush() -> DeltaEventType:
+        nonlocal buffer_size
+        event = buffer_type(delta="".join(buffer))
+        buffer.clear()
+        buffer_size = 0
+        return event
+
+    try:
+        while True:
+            if not buffer:
+                item = await queue.get()
+            else:
+                try:
+                    item = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    yield flush()
+                    continue
+
+            if isinstance(item, _End):
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+
+            if isinstance(item, TextDeltaEvent | ThinkingDeltaEvent):
+                if buffer and type(item) is not buffer_type:
+                    yield flush()
+                if not buffer:
+                    buffer_type = type(item)
+                    deadline = loop.time() + flush_ms / 1000
+                buffer.append(item.delta)
+                buffer_size += len(item.delta)
+                if buffer_size >= flush_size:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield item
+
+        if buffer:
+            yield flush()
+    finally:
+        producer.cancel()
+        # Let the source tear down (e.g. cancel its agent run) before returning
+        with contextlib.suppress(asyncio.CancelledError):
+            await producer
+
+
+async def merge_streams(
+    streams: Mapping[K, AsyncGenerator[T, None]],
+) -> AsyncGenerator[tuple[K, T], None]:
+    """
+    Interleave the items of `streams` as they arrive, each with its stream's key.
+
+    Every stream is consumed concurrently by its own task. Closing the merged
+    stream, or an error in any stream, closes all the others.
+    """
+    queue: asyncio.Queue[tuple[K, T] | _Failure | _End] = asyncio.Queue()
+
+    async def produce(key: K, stream: AsyncGenerator[T, None]) -> None:
+        try:
+            async with aclosing(stream):
+                async for item in stream:
+                    queue.put_nowait((key, item))
+        except Exception as e:
+            queue.put_nowait(_Failure(e))
+        finally:
+            queue.put_nowait(_End())
+
+    producers = [
+        asyncio.create_task(produce(key, stream)) for key, stream in streams.items()
+    ]
+    remaining = len(producers)
+    try:
+        while remaining:
+            item = await queue.get()
+            if isinstance(item, _End):
+                remaining -= 1
+            elif isinstance(item, _Failure):
+                raise item.error
+            else:
+                yield item
+    finally:
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
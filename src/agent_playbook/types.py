@@ -1,6 +1,6 @@
 from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pydantic_ai import CallDeferred, RunContext, ToolsetTool, WrapperToolset
 
 
@@ -42,11 +42,52 @@ class ErrorEvent(BaseModel):
 class MessageHistoryEvent(BaseModel):
     type: Literal["message_history"] = "message_history"
     message_history: list[dict[str, Any]]
+    # Number of leading messages the client already has; `message_history`
+    # replaces everything after them
+    prefix_length: int = 0
+
+
+class ConversationSavedEvent(BaseModel):
+    type: Literal["conversation_saved"] = "conversation_saved"
+    conversation_id: str
+    # Ids of the branch's messages from the start of the conversation; pass one
+    # as `message_id` to continue (or fork) the conversation after it
+    message_ids: list[int]
+
+
+class QueuedEvent(BaseModel):
+    type: Literal["queued"] = "queued"
+    # Runs ahead of this one in the queue of its agent or model, plus one
+    position: int
+
+
+class ModelRaceEvent(BaseModel):
+    type: Literal["model_race"] = "model_race"
+    # Model that answered a request of a hedged model first, e.g. "openai:gpt-4o"
+    winner: str
+    # Position of the winner in the hedged models, 0 for the primary
+    index: int
+    # Number of models started for the request, the winner included
+    started: int
+    first_event_ms: float
+
+
+class UsageEvent(BaseModel):
+    type: Literal["usage"] = "usage"
+    input_tokens: int
+    output_tokens: int
+    # Model requests made by the run
+    requests: int
+    tool_calls: int
+    # In dollars, None unless every model that answered has a price
+    cost: float | None = None
 
 
 class DoneEvent(BaseModel):
     type: Literal["done"] = "done"
     status: Literal["complete", "pending_approval"]
+    # Set when pending approval: post it with the decisions to resume the run
+    resume_token: str | None = None
 
 
 StreamEventType = (
@@ -57,10 +98,51 @@ StreamEventType = (
     | ToolApprovalRequestEvent
     | ErrorEvent
     | MessageHistoryEvent
+    | ConversationSavedEvent
+    | QueuedEvent
+    | ModelRaceEvent
+    | UsageEvent
     | DoneEvent
 )
 
 
+class MatrixRunInfo(BaseModel):
+    run_id: str
+    agent: str
+    scenario: str
+    model: str
+
+
+class MatrixRunsEvent(BaseModel):
+    type: Literal["matrix_runs"] = "matrix_runs"
+    runs: list[MatrixRunInfo]
+
+
+class MatrixRunEvent(BaseModel):
+    type: Literal["run_event"] = "run_event"
+    run_id: str
+    event: StreamEventType = Field(discriminator="type")
+
+
+class MatrixRunSummary(BaseModel):
+    run_id: str
+    status: Literal["complete", "pending_approval", "error"] = "complete"
+    error: str | None = None
+    first_delta_ms: float | None = None
+    duration_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float | None = None
+
+
+class MatrixSummaryEvent(BaseModel):
+    type: Literal["matrix_summary"] = "matrix_summary"
+    runs: list[MatrixRunSummary]
+
+
+MatrixStreamEventType = MatrixRunsEvent | MatrixRunEvent | MatrixSummaryEvent
+
+
 class DeferredToolResults(BaseModel):
     calls: dict[str, Any] = {}
     approvals: dict[str, bool] = {}
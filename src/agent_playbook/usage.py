@@ -0,0 +1,153 @@
+import json
+import time
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_ai.messages import ModelMessage
+
+DEFAULT_MAX_USAGE_RECORDS = 10_000
+
+
+class ModelPrice(BaseModel):
+    """Price of a model, in dollars per million tokens."""
+
+    input: float
+    output: float
+
+
+_prices_adapter = TypeAdapter(dict[str, ModelPrice])
+
+
+def load_model_prices(path: str | Path) -> dict[str, ModelPrice]:
+    """Read prices keyed by model name, e.g. `{"gpt-4o": {"input": 2.5, "output": 10}}`."""
+    return _prices_adapter.validate_python(json.loads(Path(path).read_text()))
+
+
+@dataclass
+class UsageRecord:
+    """The usage of one finished run."""
+
+    agent: str
+    scenario: str
+    model: str
+    # Session or conversation the run continued, if any
+    session_id: str | None
+    input_tokens: int
+    output_tokens: int
+    requests: int
+    tool_calls: int
+    # None when a response's model has no price
+    cost: float | None
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class UsageTotals:
+    agent: str
+    scenario: str
+    model: str
+    runs: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+    # Cost of the priced runs only
+    cost: float | None = None
+
+    def add(self, record: UsageRecord) -> None:
+        self.runs += 1
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.requests += record.requests
+        self.tool_calls += record.tool_calls
+        if record.cost is not None:
+            self.cost = (self.cost or 0) + record.cost
+
+
+class _UsageLedger:
+    def __init__(self, max_records: int = DEFAULT_MAX_USAGE_RECORDS) -> None:
+        self.prices: dict[str, ModelPrice] = {}
+        self._records: deque[UsageRecord] = deque(maxlen=max_records)
+
+    def configure(
+        self,
+        prices: dict[str, ModelPrice] | None = None,
+        max_records: int = DEFAULT_MAX_USAGE_RECORDS,
+    ) -> None:
+        """Set the model prices, e.g. from `--model-prices`, and how many runs to keep."""
+        self.prices = prices or {}
+        if max_records != self._records.maxlen:
+            self._records = deque(self._records, maxlen=max_records)
+
+    def _price(self, provider_name: str | None, model_name: str) -> ModelPrice | None:
+        if provider_name is not None:
+            price = self.prices.get(f"{provider_name}:{model_name}")
+            if price is not None:
+                return price
+        return self.prices.get(model_name)
+
+    def cost(self, messages: Iterable[ModelMessage]) -> float | None:
+        """
+        The cost of the responses in `messages`, each priced by its own model.
+
+        Responses answered by a hedged or fallback model are priced by the model
+        that actually answered. None when any response's model has no price.
+        """
+        total = 0.0
+        for message in messages:
+            if message.kind != "response":
+                continue
+            price = self._price(message.provider_name, message.model_name or "")
+            if price is None:
+                return None
+            total += (
+                message.usage.input_tokens * price.input
+                + message.usage.output_tokens * price.output
+            ) / 1_000_000
+        return total
+
+    def record(self, record: UsageRecord) -> None:
+        # The oldest records are dropped once the buffer is full
+        self._records.append(record)
+
+    def totals(
+        self,
+        agent: str | None = None,
+        scenario: str | None = None,
+        model: str | None = None,
+        session_id: str | None = None,
+        since: float | None = None,
+    ) -> list[UsageTotals]:
+        """
+        Usage of the kept runs matching the filters, by agent, scenario and model.
+
+        The most expensive come first, then the ones using the most tokens.
+        """
+        totals: dict[tuple[str, str, str], UsageTotals] = {}
+        for record in self._records:
+            if (
+                (agent and record.agent != agent)
+                or (scenario and record.scenario != scenario)
+                or (model and record.model != model)
+                or (session_id and record.session_id != session_id)
+                or (since is not None and record.timestamp < since)
+            ):
+                continue
+            key = (record.agent, record.scenario, record.model)
+            if key not in totals:
+                totals[key] = UsageTotals(*key)
+            totals[key].add(record)
+        return sorted(
+            totals.values(),
+            key=lambda t: (t.cost or 0, t.input_tokens + t.output_tokens),
+            reverse=True,
+        )
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+usage_ledger = _UsageLedger()
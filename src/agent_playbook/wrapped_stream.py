@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from pydantic_ai.messages import ModelResponse
+from pydantic_ai.models import StreamedResponse
+from pydantic_ai.usage import RequestUsage
+
+
+@dataclass
+class WrappedStreamedResponse(StreamedResponse):
+    """
+    A stream passing on the events of `wrapped`, which builds the response.
+
+    Subclasses implement `_get_event_iterator`, iterating the wrapped stream's.
+    """
+
+    wrapped: StreamedResponse = field(kw_only=True)
+
+    def __post_init__(self) -> None:
+        # The wrapped stream applies the deltas; sharing its parts lets the part
+        # end events derived here see them
+        self._parts_manager = self.wrapped._parts_manager
+
+    def get(self) -> ModelResponse:
+        return self.wrapped.get()
+
+    def usage(self) -> RequestUsage:
+        return self.wrapped.usage()
+
+    @property
+    def model_name(self) -> str:
+        return self.wrapped.model_name
+
+    @property
+    def provider_name(self) -> str | None:
+        return self.wrapped.provider_name
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.wrapped.timestamp
@@ -0,0 +1,30 @@
+import pytest
+
+from agent_playbook.admission import Ticket, _AdmissionControl
+from agent_playbook.api import _model_name_label
+
+
+async def admitted(ticket: Ticket) -> bool:
+    """Whether `ticket` got its slots without queueing."""
+    async for _ in ticket.wait():
+        return False
+    return True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limits", [(1, 3), (3, 1)])
+async def test_lowest_model_limit_applies_in_any_order(
+    limits: tuple[int, int],
+) -> None:
+    control = _AdmissionControl()
+    first_limit, second_limit = limits
+
+    first = control.ticket("support", "test:test", max_model_runs=first_limit)
+    second = control.ticket("sales", "test:test", max_model_runs=second_limit)
+
+    assert await admitted(first)
+    assert not await admitted(second)
+
+
+def test_model_names_are_normalized() -> None:
+    assert _model_name_label("test") == _model_name_label("test:test") == "test:test"
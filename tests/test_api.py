@@ -0,0 +1,205 @@
+import asyncio
+import json
+import sys
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+from starlette.types import Message
+
+from agent_playbook import api
+from agent_playbook._export import export_agent
+from agent_playbook._export.export_types import ExportedAgent
+from agent_playbook.admission import _AdmissionControl
+from agent_playbook.agent_loader import _AgentLoader
+from agent_playbook.metrics import metrics
+
+AGENTS_MODULE = """
+from pydantic_ai import Agent
+from agent_playbook import export
+
+export(agent=Agent("test"), scenarios=[{{"name": "{scenario}"}}], agent_name="support")
+"""
+
+
+def exported(agent_name: str) -> ExportedAgent[None, Any, Any]:
+    return ExportedAgent(
+        agent=Agent(TestModel()),
+        scenarios=[],
+        agent_name=agent_name,
+        model=None,
+        init_dependencies_fn=lambda _: None,
+    )
+
+
+@pytest.fixture
+def loader(monkeypatch: pytest.MonkeyPatch) -> _AgentLoader:
+    loader = _AgentLoader()
+    monkeypatch.setattr(api, "agent_loader", loader)
+    monkeypatch.setattr(export_agent, "agent_loader", loader)
+    monkeypatch.setattr(api, "_agents_response_cache", None)
+    return loader
+
+
+@pytest_asyncio.fixture
+async def client(loader: _AgentLoader) -> AsyncIterator[httpx.AsyncClient]:
+    app = FastAPI()
+    app.include_router(api.api_router)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def agents_module(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """The file of module `etag_agents`, exporting agent "support"."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # Rewritten files may keep their size and mtime, so no stale bytecode
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    yield tmp_path / "etag_agents.py"
+    sys.modules.pop("etag_agents", None)
+
+
+async def get_etag(client: httpx.AsyncClient) -> str:
+    response = await client.get("/api/agents")
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_is_not_modified(
+    client: httpx.AsyncClient, loader: _AgentLoader
+) -> None:
+    loader.register_agent(exported("support"))
+    etag = await get_etag(client)
+
+    response = await client.get("/api/agents", headers={"If-None-Match": etag})
+    weak = await client.get("/api/agents", headers={"If-None-Match": f"W/{etag}"})
+    other = await client.get("/api/agents", headers={"If-None-Match": '"other"'})
+
+    assert response.status_code == weak.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert other.status_code == 200
+    assert other.json()["agents"][0]["name"] == "support"
+
+
+@pytest.mark.asyncio
+async def test_registering_an_agent_changes_the_etag(
+    client: httpx.AsyncClient, loader: _AgentLoader
+) -> None:
+    loader.register_agent(exported("support"))
+    etag = await get_etag(client)
+
+    loader.register_agent(exported("sales"))
+    response = await client.get("/api/agents", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_reloading_an_agent_changes_the_etag(
+    client: httpx.AsyncClient, loader: _AgentLoader, agents_module: Path
+) -> None:
+    agents_module.write_text(AGENTS_MODULE.format(scenario="first"))
+    loader.reload_modules(["etag_agents"], set())
+    etag = await get_etag(client)
+
+    agents_module.write_text(AGENTS_MODULE.format(scenario="reloaded"))
+    loader.reload_modules(["etag_agents"], set())
+    response = await client.get("/api/agents", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    [agent] = response.json()["agents"]
+    assert [scenario["name"] for scenario in agent["settings"]] == ["reloaded"]
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_the_run_and_frees_its_slot(
+    loader: _AgentLoader, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    admission_control = _AdmissionControl()
+    monkeypatch.setattr(api, "admission_control", admission_control)
+    tool_started, tool_cancelled = asyncio.Event(), asyncio.Event()
+    agent = Agent(TestModel())
+
+    @agent.tool_plain
+    async def wait_forever() -> str:
+        tool_started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            tool_cancelled.set()
+            raise
+        return "Never"
+
+    loader.register_agent(
+        ExportedAgent(
+            agent=agent,
+            scenarios=[],
+            agent_name="disconnecting",
+            model=None,
+            init_dependencies_fn=lambda _: None,
+            max_concurrent_runs=1,
+        )
+    )
+    app = FastAPI()
+    app.include_router(api.api_router)
+    body = json.dumps(
+        {
+            "agent": "disconnecting",
+            "messages": [
+                {
+                    "kind": "request",
+                    "parts": [{"part_kind": "user-prompt", "content": "Hi"}],
+                }
+            ],
+        }
+    ).encode()
+    request_sent = False
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # The client leaves while the run is in its tool call
+        await tool_started.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(_: Message) -> None:
+        pass
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/chat",
+        "headers": [(b"content-type", b"application/json")],
+        "query_string": b"",
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+
+    assert tool_cancelled.is_set()
+    # Its agent slot is free again
+    ticket = admission_control.ticket("disconnecting", "test:test", max_agent_runs=1)
+    positions = ticket.wait()
+    assert await asyncio.wait_for(anext(positions, None), 1) is None
+    ticket.release()
+    # It is no longer in flight, and counted as cancelled
+    runs = {
+        labels: value
+        for labels, value in metrics.runs_in_flight._values.items()
+        if labels[0] == "disconnecting"
+    }
+    assert list(runs.values()) == [0]
+    [labels] = runs
+    assert metrics.runs._values[(*labels, "cancelled")] == 1
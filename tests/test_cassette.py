@@ -0,0 +1,141 @@
+import gc
+import weakref
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ModelResponseStreamEvent,
+    PartEndEvent,
+    PartStartEvent,
+    TextPart,
+)
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agent_playbook.cassette import Cassette, CassetteMissError
+
+PARAMETERS = ModelRequestParameters()
+
+
+class Upstream:
+    """A model answering "Hello world", which fails once `offline` is set."""
+
+    def __init__(self) -> None:
+        self.offline = False
+        self.calls = 0
+        self.model = FunctionModel(self.respond, stream_function=self.stream)
+
+    def _call(self) -> None:
+        if self.offline:
+            raise AssertionError("The model was called while replaying")
+        self.calls += 1
+
+    def respond(self, _: list[ModelMessage], __: AgentInfo) -> ModelResponse:
+        self._call()
+        return ModelResponse(parts=[TextPart("Hello world")])
+
+    async def stream(self, _: list[ModelMessage], __: AgentInfo) -> AsyncIterator[str]:
+        self._call()
+        yield "Hello "
+        yield "world"
+
+
+def messages(prompt: str = "Hi") -> list[ModelMessage]:
+    return [ModelRequest.user_text_prompt(prompt)]
+
+
+async def stream_events(
+    cassette: Cassette, upstream: Upstream
+) -> tuple[list[ModelResponseStreamEvent], ModelResponse]:
+    model = cassette.wrap(upstream.model)
+    async with model.request_stream(messages(), None, PARAMETERS) as response:
+        events = [event async for event in response]
+    return events, response.get()
+
+
+def text_of(events: list[ModelResponseStreamEvent]) -> str:
+    # The text of the last part end event, i.e. the final text
+    ends = [event for event in events if isinstance(event, PartEndEvent)]
+    assert ends
+    part = ends[-1].part
+    assert isinstance(part, TextPart)
+    return part.content
+
+
+@pytest.mark.asyncio
+async def test_stream_round_trip(tmp_path: Path) -> None:
+    upstream = Upstream()
+    recorded_events, recorded = await stream_events(Cassette(tmp_path), upstream)
+
+    upstream.offline = True
+    replay = Cassette(tmp_path, mode="replay", speed=float("inf"))
+    replayed_events, replayed = await stream_events(replay, upstream)
+
+    assert upstream.calls == 1
+    assert text_of(recorded_events) == text_of(replayed_events) == "Hello world"
+    assert [type(e) for e in replayed_events] == [type(e) for e in recorded_events]
+    assert replayed.parts == recorded.parts
+
+
+@pytest.mark.asyncio
+async def test_request_round_trip(tmp_path: Path) -> None:
+    upstream = Upstream()
+    model = Cassette(tmp_path).wrap(upstream.model)
+    recorded = await model.request(messages(), None, PARAMETERS)
+
+    upstream.offline = True
+    replay = Cassette(tmp_path, mode="replay", speed=float("inf"))
+    replayed = await replay.wrap(upstream.model).request(messages(), None, PARAMETERS)
+
+    assert upstream.calls == 1
+    assert replayed.parts == recorded.parts
+
+
+@pytest.mark.asyncio
+async def test_request_recording_replays_as_stream(tmp_path: Path) -> None:
+    upstream = Upstream()
+    await Cassette(tmp_path).wrap(upstream.model).request(messages(), None, PARAMETERS)
+
+    upstream.offline = True
+    replay = Cassette(tmp_path, mode="replay", speed=float("inf"))
+    events, response = await stream_events(replay, upstream)
+
+    assert any(isinstance(event, PartStartEvent) for event in events)
+    assert text_of(events) == "Hello world"
+    assert response.parts == [TextPart("Hello world")]
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises(tmp_path: Path) -> None:
+    upstream = Upstream()
+    upstream.offline = True
+    model = Cassette(tmp_path, mode="replay").wrap(upstream.model)
+
+    with pytest.raises(CassetteMissError):
+        await model.request(messages("Unrecorded"), None, PARAMETERS)
+
+
+def test_wrap_reuses_models_named_alike(tmp_path: Path) -> None:
+    cassette = Cassette(tmp_path)
+
+    # Equal names from different requests are different str objects
+    wrapped = {id(cassette.wrap("".join(["te", "st"]))) for _ in range(3)}
+
+    assert len(wrapped) == 1
+    assert len(cassette._named_models) == 1
+
+
+def test_wrap_keeps_no_model_instance_alive(tmp_path: Path) -> None:
+    cassette = Cassette(tmp_path)
+    model = Upstream().model
+    cassette.wrap(model)
+    model_ref = weakref.ref(model)
+
+    del model
+    gc.collect()
+
+    assert model_ref() is None
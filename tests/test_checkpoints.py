@@ -0,0 +1,129 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from pydantic_ai import Agent, DeferredToolRequests
+from pydantic_ai.models.test import TestModel
+
+from agent_playbook import api
+from agent_playbook._export.export_types import ExportedAgent
+from agent_playbook.agent_loader import _AgentLoader
+from agent_playbook.checkpoints import _CheckpointStore
+
+
+def exported(agent_name: str) -> ExportedAgent[None, Any, Any]:
+    """An agent calling its `lookup` tool, then answering with the result."""
+    agent = Agent(TestModel(), output_type=[str, DeferredToolRequests])
+
+    @agent.tool_plain
+    def lookup(key: str) -> str:
+        return key.upper()
+
+    return ExportedAgent(
+        agent=agent,
+        scenarios=[],
+        agent_name=agent_name,
+        model=None,
+        init_dependencies_fn=lambda _: None,
+    )
+
+
+@pytest.fixture
+def loader(monkeypatch: pytest.MonkeyPatch) -> _AgentLoader:
+    loader = _AgentLoader()
+    loader.register_agent(exported("support"))
+    loader.register_agent(exported("sales"))
+    monkeypatch.setattr(api, "agent_loader", loader)
+    monkeypatch.setattr(api, "checkpoint_store", _CheckpointStore())
+    return loader
+
+
+@pytest_asyncio.fixture
+async def client(loader: _AgentLoader) -> AsyncIterator[httpx.AsyncClient]:
+    app = FastAPI()
+    app.include_router(api.api_router)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+async def chat(client: httpx.AsyncClient, **request: Any) -> list[dict[str, Any]]:
+    response = await client.post("/api/chat", json={"agent": "support", **request})
+    response.raise_for_status()
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def pause(client: httpx.AsyncClient) -> dict[str, Any]:
+    """Run until the tool call awaits approval, and return the resume request."""
+    events = await chat(
+        client,
+        messages=[
+            {
+                "kind": "request",
+                "parts": [{"part_kind": "user-prompt", "content": "Hi"}],
+            }
+        ],
+        use_tools="request_approval",
+    )
+    [approval] = [event for event in events if event["type"] == "tool_approval_request"]
+    assert events[-1]["status"] == "pending_approval"
+    return {
+        "resume_token": events[-1]["resume_token"],
+        "deferred_tool_results": {"approvals": {approval["tool_call_id"]: True}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_resume_runs_the_approved_tool(client: httpx.AsyncClient) -> None:
+    resume = await pause(client)
+
+    events = await chat(client, **resume)
+
+    assert events[-1] == {"type": "done", "status": "complete", "resume_token": None}
+    [history] = [event for event in events if event["type"] == "message_history"]
+    returns = [
+        part
+        for message in history["message_history"]
+        for part in message["parts"]
+        if part["part_kind"] == "tool-return"
+    ]
+    assert [part["content"] for part in returns] == ["A"]
+
+
+@pytest.mark.asyncio
+async def test_token_resumes_once(client: httpx.AsyncClient) -> None:
+    resume = await pause(client)
+    await chat(client, **resume)
+
+    response = await client.post("/api/chat", json={"agent": "support", **resume})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_unknown(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(api, "checkpoint_store", _CheckpointStore(ttl_seconds=0))
+    resume = await pause(client)
+
+    response = await client.post("/api/chat", json={"agent": "support", **resume})
+
+    assert response.status_code == 404
+    assert "Unknown resume token" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_wrong_agent_leaves_the_token_usable(client: httpx.AsyncClient) -> None:
+    resume = await pause(client)
+
+    response = await client.post("/api/chat", json={"agent": "sales", **resume})
+    events = await chat(client, **resume)
+
+    assert response.status_code == 404
+    assert events[-1]["status"] == "complete"
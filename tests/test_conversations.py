@@ -0,0 +1,93 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+)
+
+from agent_playbook import conversations
+from agent_playbook.api import api_router
+from agent_playbook.conversations import ConversationStore, set_conversation_store
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> Iterator[ConversationStore]:
+    store = ConversationStore(tmp_path / "conversations.db")
+    yield store
+    store.close()
+
+
+def exchange(prompt: str, answer: str) -> list[ModelMessage]:
+    return [
+        ModelRequest.user_text_prompt(prompt),
+        ModelResponse(parts=[TextPart(answer)]),
+    ]
+
+
+def test_cursor_knows_its_agent(store: ConversationStore) -> None:
+    conversation = store.create("support")
+
+    cursor = store.cursor(conversation.conversation_id)
+
+    assert cursor.agent == "support"
+
+
+def test_cursor_returns_copies_of_cached_messages(store: ConversationStore) -> None:
+    conversation = store.create("support")
+    cursor = store.cursor(conversation.conversation_id)
+    messages = exchange("Hi", "Hello")
+    [_, head] = store.save(cursor, messages, keep=0)
+
+    loaded = store.cursor(conversation.conversation_id, head).messages
+    # As a run does when it re-evaluates dynamic system prompts
+    loaded[0].parts = [SystemPromptPart("Changed")]
+
+    reloaded = store.cursor(conversation.conversation_id, head).messages
+    assert reloaded == messages
+
+
+def test_forks_share_their_prefix(store: ConversationStore) -> None:
+    conversation = store.create("support")
+    cursor = store.cursor(conversation.conversation_id)
+    [_, first_answer] = store.save(cursor, exchange("Hi", "Hello"), keep=0)
+
+    fork = store.cursor(conversation.conversation_id, first_answer)
+    store.save(fork, [*fork.messages, *exchange("Bye", "Goodbye")], keep=2)
+    other = store.cursor(conversation.conversation_id, first_answer)
+    store.save(other, [*other.messages, *exchange("Why", "Because")], keep=2)
+
+    [listed] = store.list_conversations(agent="support")
+    assert sorted(branch.length for branch in listed.branches) == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_chat_rejects_another_agents_conversation(
+    store: ConversationStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(conversations, "_conversation_store", None)
+    set_conversation_store(store)
+    conversation = store.create("support")
+    app = FastAPI()
+    app.include_router(api_router)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post(
+            "/api/chat",
+            json={
+                "agent": "sales",
+                "conversation_id": conversation.conversation_id,
+                "messages": [],
+            },
+        )
+
+    assert response.status_code == 409
+    assert "support" in response.json()["detail"]
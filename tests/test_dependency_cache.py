@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agent_playbook import dependency_cache
+from agent_playbook.dependency_cache import DependencyCache
+
+
+class Deps:
+    def __init__(self, settings: dict[str, str]) -> None:
+        self.name = settings["name"]
+
+
+class Closed:
+    """A `close` function recording the names of the dependencies it closed."""
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+
+    async def __call__(self, deps: Deps) -> None:
+        self.names.append(deps.name)
+
+
+async def lease(cache: DependencyCache[Deps], name: str) -> Deps:
+    async with cache.lease({"name": name}, Deps) as deps:
+        return deps
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """The time seen by the cache, in seconds; set `clock[0]` to move it."""
+    now = [0.0]
+    monkeypatch.setattr(
+        dependency_cache, "time", SimpleNamespace(monotonic=lambda: now[0])
+    )
+    return now
+
+
+@pytest.mark.asyncio
+async def test_equal_settings_reuse_dependencies() -> None:
+    cache: DependencyCache[Deps] = DependencyCache()
+
+    first = await lease(cache, "a")
+
+    assert await lease(cache, "a") is first
+    assert await lease(cache, "b") is not first
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_is_evicted_and_closed() -> None:
+    closed = Closed()
+    cache = DependencyCache(max_size=2, close=closed)
+    a = await lease(cache, "a")
+    await lease(cache, "b")
+    await lease(cache, "a")
+
+    await lease(cache, "c")
+
+    assert closed.names == ["b"]
+    assert len(cache) == 2
+    assert await lease(cache, "a") is a
+
+
+@pytest.mark.asyncio
+async def test_unused_entries_expire(clock: list[float]) -> None:
+    closed = Closed()
+    cache = DependencyCache(ttl_seconds=10, close=closed)
+    a = await lease(cache, "a")
+
+    clock[0] = 5
+    assert await lease(cache, "a") is a
+    clock[0] = 14
+    await lease(cache, "b")
+    assert closed.names == []
+
+    clock[0] = 26
+    assert await lease(cache, "a") is not a
+    assert closed.names == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_leased_dependencies_are_closed_on_release() -> None:
+    closed = Closed()
+    cache = DependencyCache(max_size=1, close=closed)
+
+    async with cache.lease({"name": "a"}, Deps):
+        await lease(cache, "b")
+        # Evicted, but still used by the run
+        assert closed.names == []
+
+    assert closed.names == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_leased_dependencies_on_release() -> None:
+    closed = Closed()
+    cache = DependencyCache(close=closed)
+    await lease(cache, "a")
+
+    async with cache.lease({"name": "b"}, Deps):
+        await cache.aclose()
+        assert closed.names == ["a"]
+
+    assert closed.names == ["a", "b"]
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_close_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+    async def close(deps: Deps) -> None:
+        raise RuntimeError("boom")
+
+    cache = DependencyCache(max_size=1, close=close)
+    await lease(cache, "a")
+
+    await lease(cache, "b")
+
+    assert "Failed to close cached dependencies" in caplog.text
@@ -0,0 +1,146 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from agent_playbook.dev_proxy import DevServerProxy
+
+
+async def echo(request: Request) -> Response:
+    response = Response(
+        json.dumps(sorted(request.headers.keys())),
+        headers={"connection": "x-private", "x-private": "1", "keep-alive": "5"},
+        media_type="application/json",
+    )
+    response.set_cookie("a", "1")
+    response.set_cookie("b", "2")
+    return response
+
+
+upstream_app = Starlette(routes=[Route("/echo", echo)])
+
+
+def proxy_app(proxy: DevServerProxy) -> FastAPI:
+    app = FastAPI()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST"])
+    async def proxy_to_dev_server(request: Request, path: str) -> StreamingResponse:
+        return await proxy.proxy(request, path)
+
+    return app
+
+
+def client(proxy: DevServerProxy) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=proxy_app(proxy)), base_url="http://test"
+    )
+
+
+def request(path: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": [],
+            "query_string": b"",
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_streams_body_in_chunks() -> None:
+    first_chunk_sent = asyncio.Event()
+
+    async def body() -> AsyncIterator[bytes]:
+        yield b"first"
+        await first_chunk_sent.wait()
+        yield b"second"
+
+    async def handler(_: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    proxy = DevServerProxy(transport=httpx.MockTransport(handler))
+    response = await proxy.proxy(request("/stream"), "stream")
+    chunks = aiter(response.body_iterator)
+
+    # The second chunk only exists once the first one went through
+    assert await asyncio.wait_for(anext(chunks), 1) == b"first"
+    first_chunk_sent.set()
+    assert await anext(chunks) == b"second"
+    await proxy.aclose()
+
+
+@pytest.mark.asyncio
+async def test_strips_hop_by_hop_headers() -> None:
+    proxy = DevServerProxy(transport=httpx.ASGITransport(app=upstream_app))
+    async with client(proxy) as http:
+        response = await http.get(
+            "/echo",
+            headers={
+                "connection": "x-secret",
+                "x-secret": "1",
+                "keep-alive": "5",
+                "x-kept": "1",
+            },
+        )
+    await proxy.aclose()
+
+    forwarded = response.json()
+    assert "x-kept" in forwarded
+    assert "x-secret" not in forwarded
+    assert "keep-alive" not in forwarded
+    assert "x-private" not in response.headers
+    assert "keep-alive" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_keeps_duplicate_set_cookie_headers() -> None:
+    proxy = DevServerProxy(transport=httpx.ASGITransport(app=upstream_app))
+    async with client(proxy) as http:
+        response = await http.get("/echo")
+    await proxy.aclose()
+
+    cookies = response.headers.get_list("set-cookie")
+    assert [cookie.split(";")[0] for cookie in cookies] == ["a=1", "b=2"]
+
+
+@pytest.mark.asyncio
+async def test_reuses_upstream_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    clients: list[httpx.AsyncClient] = []
+
+    class RecordingClient(httpx.AsyncClient):
+        def __init__(self, **kwargs: object) -> None:
+            super().__init__(**kwargs)  # type: ignore[arg-type]
+            clients.append(self)
+
+    monkeypatch.setattr(httpx, "AsyncClient", RecordingClient)
+    proxy = DevServerProxy(transport=httpx.ASGITransport(app=upstream_app))
+    monkeypatch.undo()
+    async with client(proxy) as http:
+        for _ in range(3):
+            assert (await http.get("/echo")).status_code == 200
+    await proxy.aclose()
+
+    assert len(clients) == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_down_returns_bad_gateway() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    proxy = DevServerProxy(transport=httpx.MockTransport(handler))
+    async with client(proxy) as http:
+        response = await http.get("/")
+    await proxy.aclose()
+
+    assert response.status_code == 502
+    assert "not reachable" in response.json()["detail"]
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+import pytest
+from pydantic_ai.exceptions import FallbackExceptionGroup
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    PartEndEvent,
+    TextPart,
+)
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agent_playbook.hedging import HedgedModel, ModelRace, set_race_listener
+
+PARAMETERS = ModelRequestParameters()
+MESSAGES: list[ModelMessage] = [ModelRequest.user_text_prompt("Hi")]
+
+
+class Delayed:
+    """A model answering its name after `delay` seconds, or failing if `fails`."""
+
+    def __init__(self, name: str, delay: float = 0, fails: bool = False) -> None:
+        self.name = name
+        self.delay = delay
+        self.fails = fails
+        self.calls = 0
+        self.model = FunctionModel(
+            self.respond, stream_function=self.stream, model_name=name
+        )
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fails:
+            raise RuntimeError(f"{self.name} failed")
+
+    async def respond(self, _: list[ModelMessage], __: AgentInfo) -> ModelResponse:
+        await self._wait()
+        return ModelResponse(parts=[TextPart(self.name)])
+
+    async def stream(self, _: list[ModelMessage], __: AgentInfo) -> AsyncIterator[str]:
+        await self._wait()
+        yield self.name
+        yield "!"
+
+
+def race_listener() -> list[ModelRace]:
+    races: list[ModelRace] = []
+    set_race_listener(races.append)
+    return races
+
+
+@pytest.mark.asyncio
+async def test_primary_answering_before_the_delay_wins_alone() -> None:
+    primary, backup = Delayed("primary"), Delayed("backup")
+    races = race_listener()
+    model = HedgedModel(primary.model, backup.model, hedge_delay=1)
+
+    response = await model.request(MESSAGES, None, PARAMETERS)
+
+    assert response.parts == [TextPart("primary")]
+    assert (primary.calls, backup.calls) == (1, 0)
+    assert [(race.index, race.started) for race in races] == [(0, 1)]
+
+
+@pytest.mark.asyncio
+async def test_backup_wins_when_the_primary_is_late() -> None:
+    primary, backup = Delayed("primary", delay=5), Delayed("backup")
+    races = race_listener()
+    model = HedgedModel(primary.model, backup.model, hedge_delay=0.05)
+
+    async with model.request_stream(MESSAGES, None, PARAMETERS) as response:
+        events = [event async for event in response]
+
+    # The event that decided the race is streamed too
+    ends = [event for event in events if isinstance(event, PartEndEvent)]
+    assert [end.part for end in ends] == [TextPart("backup!")]
+    assert response.get().parts == [TextPart("backup!")]
+    assert response.model_name == "backup"
+    assert [(race.index, race.started) for race in races] == [(1, 2)]
+
+
+@pytest.mark.asyncio
+async def test_failing_primary_starts_the_backup_right_away() -> None:
+    primary, backup = Delayed("primary", fails=True), Delayed("backup")
+    model = HedgedModel(primary.model, backup.model, hedge_delay=10)
+
+    start = time.perf_counter()
+    async with model.request_stream(MESSAGES, None, PARAMETERS) as response:
+        async for _ in response:
+            pass
+
+    assert time.perf_counter() - start < 1
+    assert response.get().parts == [TextPart("backup!")]
+
+
+@pytest.mark.asyncio
+async def test_all_models_failing_raises() -> None:
+    primary = Delayed("primary", fails=True)
+    backup = Delayed("backup", fails=True)
+    model = HedgedModel(primary.model, backup.model, hedge_delay=10)
+
+    with pytest.raises(FallbackExceptionGroup) as exc_info:
+        await model.request(MESSAGES, None, PARAMETERS)
+
+    assert len(exc_info.value.exceptions) == 2
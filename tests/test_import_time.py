@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules only needed to serve or run agents, never to start the CLI
+HEAVY_MODULES = {
+    "asyncio",
+    "fastapi",
+    "httpx",
+    "pydantic_ai",
+    "sqlite3",
+    "starlette",
+    "uvicorn",
+}
+
+
+def imported_modules(*args: str, env: dict[str, str] | None = None) -> set[str]:
+    """The modules imported by `python *args`, and their top-level packages."""
+    environ = {**os.environ, **(env or {})}
+    environ.pop("AGENT_PLAYBOOK_DEV", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        env=environ,
+        check=True,
+    )
+    modules = {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    return modules | {module.split(".")[0] for module in modules}
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["-c", "import agent_playbook"],
+        ["-c", "import agent_playbook.cli"],
+        ["-m", "agent_playbook.cli", "--help"],
+        ["-m", "agent_playbook.cli", "start", "--help"],
+    ],
+)
+def test_cli_imports_no_heavy_modules(args: list[str]) -> None:
+    assert imported_modules(*args) & HEAVY_MODULES == set()
+
+
+def test_server_without_dev_skips_the_dev_proxy() -> None:
+    modules = imported_modules(
+        "-c",
+        "import agent_playbook.server",
+        env={"AGENT_PLAYBOOK_PACKAGE": "unused"},
+    )
+
+    assert "fastapi" in modules
+    assert "agent_playbook.dev_proxy" not in modules
@@ -0,0 +1,60 @@
+from agent_playbook.metrics import Counter, Histogram, RunMetrics, metrics
+
+LABELS = ("agent", "scenario", "model")
+
+
+def in_flight() -> float:
+    return metrics.runs_in_flight._values.get(LABELS, 0)
+
+
+def queued() -> float:
+    return metrics.runs_queued._values.get(LABELS, 0)
+
+
+def test_runs_are_in_flight_once_admitted() -> None:
+    run = RunMetrics()
+    run.start(*LABELS)
+    run.queued()
+    assert (in_flight(), queued()) == (0, 1)
+
+    run.admitted()
+    assert (in_flight(), queued()) == (1, 0)
+
+    run.finish()
+    assert (in_flight(), queued()) == (0, 0)
+
+
+def test_runs_abandoned_in_the_queue_were_never_in_flight() -> None:
+    run = RunMetrics()
+    run.start(*LABELS)
+    run.queued()
+    run.finish()
+
+    assert (in_flight(), queued()) == (0, 0)
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count() -> None:
+    histogram = Histogram(
+        "playbook_test_seconds", "A test histogram.", ("agent",), buckets=(0.1, 1)
+    )
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(("support",), value)
+
+    assert histogram.render().splitlines() == [
+        "# HELP playbook_test_seconds A test histogram.",
+        "# TYPE playbook_test_seconds histogram",
+        'playbook_test_seconds_bucket{agent="support",le="0.1"} 2',
+        'playbook_test_seconds_bucket{agent="support",le="1"} 3',
+        'playbook_test_seconds_bucket{agent="support",le="+Inf"} 4',
+        'playbook_test_seconds_sum{agent="support"} 2.65',
+        'playbook_test_seconds_count{agent="support"} 4',
+    ]
+
+
+def test_label_values_are_escaped() -> None:
+    counter = Counter("playbook_test_total", "A test counter.", ("agent", "model"))
+    counter.inc(('say "hi"\nbye', "a\\b"))
+
+    [sample] = counter.render().splitlines()[2:]
+
+    assert sample == r'playbook_test_total{agent="say \"hi\"\nbye",model="a\\b"} 1'
@@ -0,0 +1,38 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from agent_playbook.streaming import MAX_PENDING_EVENTS, coalesce_deltas
+from agent_playbook.types import StreamEventType, TextDeltaEvent
+
+
+@pytest.mark.asyncio
+async def test_coalesce_deltas_merges_consecutive_deltas() -> None:
+    async def source() -> AsyncIterator[StreamEventType]:
+        for delta in ("a", "b", "c"):
+            yield TextDeltaEvent(delta=delta)
+
+    events = [event async for event in coalesce_deltas(source(), flush_ms=1000)]
+
+    assert events == [TextDeltaEvent(delta="abc")]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_deltas_applies_backpressure() -> None:
+    produced = 0
+
+    async def source() -> AsyncIterator[StreamEventType]:
+        nonlocal produced
+        for _ in range(MAX_PENDING_EVENTS * 10):
+            produced += 1
+            yield TextDeltaEvent(delta="x")
+
+    # Flushes after each delta, then the consumer stalls
+    events = coalesce_deltas(source(), flush_ms=1000, flush_size=1)
+    await anext(events)
+    await asyncio.sleep(0.05)
+
+    # The queue, the event the producer waits to put and the one just taken
+    assert produced <= MAX_PENDING_EVENTS + 2
+    await events.aclose()
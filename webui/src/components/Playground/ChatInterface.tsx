@@ -5,12 +5,13 @@ import type { PendingTool } from '@/hooks/usePendingToolApprovals';
 import type { ToolCallsMap } from '@/hooks/useStreamingResponse';
 import { Alert, AlertDescription } from '@/components/ui/alert';
 import { Button } from '@/components/ui/button';
-import { AlertCircle, ArrowRight } from 'lucide-react';
+import { AlertCircle, ArrowRight, Hourglass } from 'lucide-react';
 
 interface ChatInterfaceProps {
   messages: ModelMessage[];
   error: string | null;
   isLoading?: boolean;
+  queuePosition?: number | null;
   awaitingApprovals?: boolean;
   pendingTools?: PendingTool[];
   allHandled?: boolean;
@@ -26,6 +27,7 @@ export default function ChatInterface({
   messages,
   error,
   isLoading,
+  queuePosition,
   awaitingApprovals,
   pendingTools,
   allHandled,
@@ -130,6 +132,16 @@ export default function ChatInterface({
             );
           })}
 
+          {/* Queue position while the run waits for a free slot */}
+          {isLoading && queuePosition != null && (
+            <div className="flex items-center justify-center gap-2 mb-6 text-sm text-muted-foreground">
+              <Hourglass size={14} className="animate-pulse" />
+              {queuePosition === 1
+                ? 'Waiting for the model, you are next in line'
+                : `Waiting for the model, position ${queuePosition} in line`}
+            </div>
+          )}
+
           {/* Continue Button for Approvals */}
           {awaitingApprovals && (
             <div className="flex justify-center mb-6">
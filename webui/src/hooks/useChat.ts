@@ -1,8 +1,13 @@
 import { useState, useCallback, useRef } from 'react';
 import type { PlaygroundSettings } from '../types/playground';
 import type { ModelMessage } from '../types/message';
-import type { DeferredToolResults } from '../types/agent';
-import { initializeApiClient, makeStreamingChatRequest } from '../utils/apiClient';
+import type { ChatRequest, DeferredToolResults } from '../types/agent';
+import {
+  createChatSession,
+  initializeApiClient,
+  makeResumeChatRequest,
+  makeSessionChatRequest,
+} from '../utils/apiClient';
 import { useStreamingResponse } from './useStreamingResponse';
 import { usePendingToolApprovals } from './usePendingToolApprovals';
 import { editPartAndTruncate } from '../utils/messageHelpers';
@@ -11,9 +16,13 @@ export function useChat() {
   const [messages, setMessages] = useState<ModelMessage[]>([]);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [awaitingApprovals, setAwaitingApprovals] = useState(false);
   const abortControllerRef = useRef<AbortController | null>(null);
   const apiClientRef = useRef<ReturnType<typeof initializeApiClient> | null>(null);
+  const sessionRef = useRef(createChatSession());
+  // Resume token of the run paused for approvals, if any
+  const resumeTokenRef = useRef<string | null>(null);
   const { processStream, toolCallsMap, clearToolCallsMap } = useStreamingResponse();
   const {
     pendingTools,
@@ -39,9 +48,11 @@ export function useChat() {
 
       setError(null);
       setIsLoading(true);
+      resumeTokenRef.current = null;
 
       // Add user message as ModelRequest (only if not resuming)
       let apiMessages = messages;
+      let newMessages: ModelMessage[] = [];
       if (!deferredToolResults) {
         const userMessage: ModelMessage = {
           kind: 'request',
@@ -56,6 +67,7 @@ export function useChat() {
 
         setMessages((prev) => [...prev, userMessage]);
         apiMessages = messages.concat(userMessage);
+        newMessages = [userMessage];
 
         // Create assistant message placeholder
         const assistantMessage: ModelMessage = {
@@ -77,23 +89,32 @@ export function useChat() {
           // If settings are invalid JSON, use empty object
         }
 
-        const response = makeStreamingChatRequest(apiClient, {
-          agent: settings.agent,
-          messages: apiMessages,
-          settings: agentSettings,
-          stream: true,
-          use_tools: settings.forceHumanApproval ? 'request_approval' : 'auto',
-          deferred_tool_results: deferredToolResults,
-        });
+        const response = makeSessionChatRequest(
+          apiClient,
+          sessionRef.current,
+          {
+            agent: settings.agent,
+            messages: apiMessages,
+            settings: agentSettings,
+            stream: true,
+            use_tools: settings.forceHumanApproval ? 'request_approval' : 'auto',
+            deferred_tool_results: deferredToolResults,
+            history_mode: 'delta',
+          },
+          newMessages
+        );
 
         const result = await processStream({
           stream: response,
           abortControllerRef,
           setMessages,
+          baseMessages: apiMessages,
           onToolApprovalRequest: addPendingTool,
           onAwaitingApprovals: () => setAwaitingApprovals(true),
           onError: setError,
+          onQueued: setQueuePosition,
         });
+        resumeTokenRef.current = result.resumeToken ?? null;
 
         if (result.pendingApproval) {
           // Stream paused waiting for approvals
@@ -108,6 +129,7 @@ export function useChat() {
         }
       } finally {
         setIsLoading(false);
+        setQueuePosition(null);
         apiClientRef.current = null;
         abortControllerRef.current = null;
       }
@@ -137,14 +159,21 @@ export function useChat() {
           // If settings are invalid JSON, use empty object
         }
 
-        const response = makeStreamingChatRequest(apiClient, {
+        const request: ChatRequest = {
           agent: settings.agent,
           messages,
           settings: agentSettings,
           stream: true,
           use_tools: settings.forceHumanApproval ? 'request_approval' : 'auto',
           deferred_tool_results: decisions,
-        });
+          history_mode: 'delta',
+        };
+        // A resume token is used once, whether the request succeeds or not
+        const resumeToken = resumeTokenRef.current;
+        resumeTokenRef.current = null;
+        const response = resumeToken
+          ? makeResumeChatRequest(apiClient, sessionRef.current, resumeToken, request)
+          : makeSessionChatRequest(apiClient, sessionRef.current, request, []);
 
         // Clear pending tools after sending
         clearPendingTools();
@@ -153,10 +182,13 @@ export function useChat() {
           stream: response,
           abortControllerRef,
           setMessages,
+          baseMessages: messages,
           onToolApprovalRequest: addPendingTool,
           onAwaitingApprovals: () => setAwaitingApprovals(true),
           onError: setError,
+          onQueued: setQueuePosition,
         });
+        resumeTokenRef.current = result.resumeToken ?? null;
 
         if (result.pendingApproval) {
           // Stream paused again waiting for more approvals
@@ -167,6 +199,7 @@ export function useChat() {
         setError(errorMessage);
       } finally {
         setIsLoading(false);
+        setQueuePosition(null);
         apiClientRef.current = null;
         abortControllerRef.current = null;
       }
@@ -175,6 +208,8 @@ export function useChat() {
   );
 
   const clearMessages = useCallback(() => {
+    sessionRef.current = createChatSession();
+    resumeTokenRef.current = null;
     setMessages([]);
     setError(null);
     setAwaitingApprovals(false);
@@ -204,6 +239,7 @@ export function useChat() {
 
       setError(null);
       setIsLoading(true);
+      resumeTokenRef.current = null;
 
       // Edit the part and truncate all parts after it
       const truncatedMessages = editPartAndTruncate(messages, partIndex, newContent);
@@ -228,22 +264,33 @@ export function useChat() {
           // If settings are invalid JSON, use empty object
         }
 
-        const response = makeStreamingChatRequest(apiClient, {
-          agent: settings.agent,
-          messages: truncatedMessages,
-          settings: agentSettings,
-          stream: true,
-          use_tools: settings.forceHumanApproval ? 'request_approval' : 'auto',
-        });
+        // The edited history differs from the server's copy, so resend all of it
+        sessionRef.current.synced = false;
+        const response = makeSessionChatRequest(
+          apiClient,
+          sessionRef.current,
+          {
+            agent: settings.agent,
+            messages: truncatedMessages,
+            settings: agentSettings,
+            stream: true,
+            use_tools: settings.forceHumanApproval ? 'request_approval' : 'auto',
+            history_mode: 'delta',
+          },
+          truncatedMessages
+        );
 
         const result = await processStream({
           stream: response,
           abortControllerRef,
           setMessages,
+          baseMessages: truncatedMessages,
           onToolApprovalRequest: addPendingTool,
           onAwaitingApprovals: () => setAwaitingApprovals(true),
           onError: setError,
+          onQueued: setQueuePosition,
         });
+        resumeTokenRef.current = result.resumeToken ?? null;
 
         if (result.pendingApproval) {
           // Stream paused waiting for approvals
@@ -256,6 +303,7 @@ export function useChat() {
         setMessages((prev) => prev.slice(0, -1));
       } finally {
         setIsLoading(false);
+        setQueuePosition(null);
         apiClientRef.current = null;
         abortControllerRef.current = null;
       }
@@ -282,6 +330,7 @@ export function useChat() {
     messages,
     isLoading,
     error,
+    queuePosition,
     awaitingApprovals,
     pendingTools,
     allHandled,
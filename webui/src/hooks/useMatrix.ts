@@ -0,0 +1,115 @@
+import { useState, useCallback, useRef } from 'react';
+import type { MatrixRun, MatrixRunInfo, MatrixRunSummary } from '../types/agent';
+import { initializeApiClient, makeMatrixRequest } from '../utils/apiClient';
+
+export interface MatrixRunState {
+  info: MatrixRunInfo;
+  text: string;
+  toolCalls: string[];
+  queuePosition: number | null;
+  // Model that answered last, for hedged exports
+  winner: string | null;
+  summary?: MatrixRunSummary;
+}
+
+export function useMatrix() {
+  const [runs, setRuns] = useState<MatrixRunState[]>([]);
+  const [isLoading, setIsLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  const [wallTimeMs, setWallTimeMs] = useState<number | null>(null);
+  const apiClientRef = useRef<ReturnType<typeof initializeApiClient> | null>(null);
+
+  const updateRun = useCallback(
+    (runId: string, update: (run: MatrixRunState) => MatrixRunState) => {
+      setRuns((prev) => prev.map((run) => (run.info.run_id === runId ? update(run) : run)));
+    },
+    []
+  );
+
+  const runMatrix = useCallback(
+    async (baseUrl: string, prompt: string, matrixRuns: MatrixRun[]) => {
+      if (!prompt.trim() || matrixRuns.length === 0) {
+        setError('Please enter a prompt and select at least one scenario');
+        return;
+      }
+
+      setError(null);
+      setRuns([]);
+      setWallTimeMs(null);
+      setIsLoading(true);
+      const start = performance.now();
+
+      try {
+        const apiClient = initializeApiClient(baseUrl);
+        apiClientRef.current = apiClient;
+
+        for await (const event of makeMatrixRequest(apiClient, { prompt, runs: matrixRuns })) {
+          switch (event.type) {
+            case 'matrix_runs':
+              setRuns(
+                event.runs.map((info) => ({
+                  info,
+                  text: '',
+                  toolCalls: [],
+                  queuePosition: null,
+                  winner: null,
+                }))
+              );
+              break;
+
+            case 'run_event': {
+              const runEvent = event.event;
+              if (runEvent.type === 'text_delta') {
+                updateRun(event.run_id, (run) => ({
+                  ...run,
+                  text: run.text + runEvent.delta,
+                  queuePosition: null,
+                }));
+              } else if (runEvent.type === 'tool_call_executing') {
+                updateRun(event.run_id, (run) => ({
+                  ...run,
+                  toolCalls: [...run.toolCalls, runEvent.tool_name],
+                  queuePosition: null,
+                }));
+              } else if (runEvent.type === 'queued') {
+                updateRun(event.run_id, (run) => ({ ...run, queuePosition: runEvent.position }));
+              } else if (runEvent.type === 'model_race') {
+                updateRun(event.run_id, (run) => ({ ...run, winner: runEvent.winner }));
+              }
+              break;
+            }
+
+            case 'matrix_summary': {
+              const summaries = new Map(event.runs.map((summary) => [summary.run_id, summary]));
+              setRuns((prev) =>
+                prev.map((run) => ({ ...run, summary: summaries.get(run.info.run_id) }))
+              );
+              setWallTimeMs(performance.now() - start);
+              break;
+            }
+          }
+        }
+      } catch (err) {
+        const errorMessage = err instanceof Error ? err.message : 'An error occurred';
+        setError(errorMessage);
+      } finally {
+        setIsLoading(false);
+        apiClientRef.current = null;
+      }
+    },
+    [updateRun]
+  );
+
+  const cancelMatrix = useCallback(() => {
+    apiClientRef.current?.abortController.abort();
+  }, []);
+
+  return {
+    runs,
+    isLoading,
+    error,
+    wallTimeMs,
+    runMatrix,
+    cancelMatrix,
+  };
+}
@@ -18,6 +18,8 @@ interface ProcessStreamOptions {
   stream: AsyncIterable<StreamEvent>;
   abortControllerRef: React.MutableRefObject<AbortController | null>;
   setMessages: React.Dispatch<React.SetStateAction<ModelMessage[]>>;
+  // The history sent with the request, which delta message histories extend
+  baseMessages: ModelMessage[];
   onToolApprovalRequest?: (
     toolCallId: string,
     toolName: string,
@@ -25,11 +27,15 @@ interface ProcessStreamOptions {
   ) => void;
   onAwaitingApprovals?: () => void;
   onError?: (error: string) => void;
+  // Called with the queue position while the run waits, then with null once it starts
+  onQueued?: (position: number | null) => void;
 }
 
 interface ProcessStreamResult {
   completed: boolean;
   pendingApproval?: boolean;
+  // Token resuming the paused run without resending its history
+  resumeToken?: string;
 }
 
 export function useStreamingResponse() {
@@ -40,14 +46,17 @@ export function useStreamingResponse() {
       stream,
       abortControllerRef,
       setMessages,
+      baseMessages,
       onToolApprovalRequest,
       onAwaitingApprovals,
       onError,
+      onQueued,
     }: ProcessStreamOptions): Promise<ProcessStreamResult> => {
       // Accumulate deltas for real-time UI updates
       let accumulatedContent = '';
       let accumulatedThinking = '';
       const toolCallsMap = toolCallsMapRef.current;
+      let queued = false;
 
       // Event handler functions
       const handleTextDelta = (delta: string) => {
@@ -137,12 +146,16 @@ export function useStreamingResponse() {
         onToolApprovalRequest?.(toolCallId, toolName, args);
       };
 
-      const handleMessageHistory = (messageHistory: unknown[]) => {
+      const handleMessageHistory = (messageHistory: unknown[], prefixLength = 0) => {
+        if (prefixLength > baseMessages.length) {
+          onError?.('Message history is out of sync with the server');
+          return;
+        }
         try {
           const modelMessages: ModelMessage[] = messageHistory.map(
             (msg) => msg as unknown as ModelMessage
           );
-          setMessages(modelMessages);
+          setMessages(baseMessages.slice(0, prefixLength).concat(modelMessages));
         } catch (err) {
           console.error('Failed to parse message history:', err);
         }
@@ -154,6 +167,11 @@ export function useStreamingResponse() {
           throw new Error('Request cancelled');
         }
 
+        if (queued && event.type !== 'queued') {
+          queued = false;
+          onQueued?.(null);
+        }
+
         switch (event.type) {
           case 'text_delta':
             handleTextDelta(event.delta);
@@ -176,7 +194,12 @@ export function useStreamingResponse() {
             break;
 
           case 'message_history':
-            handleMessageHistory(event.message_history);
+            handleMessageHistory(event.message_history, event.prefix_length);
+            break;
+
+          case 'queued':
+            queued = true;
+            onQueued?.(event.position);
             break;
 
           case 'error':
@@ -187,7 +210,11 @@ export function useStreamingResponse() {
           case 'done':
             if (event.status === 'pending_approval') {
               onAwaitingApprovals?.();
-              return { completed: false, pendingApproval: true };
+              return {
+                completed: false,
+                pendingApproval: true,
+                resumeToken: event.resume_token ?? undefined,
+              };
             }
             break;
         }
@@ -1,3 +1,4 @@
+import { Link } from 'react-router-dom';
 import ChatInterface from '../components/Playground/ChatInterface';
 import ChatInput from '../components/Playground/ChatInput';
 import SettingsSidebar from '../components/Playground/SettingsSidebar';
@@ -12,6 +13,7 @@ export default function Home() {
     messages,
     isLoading,
     error,
+    queuePosition,
     awaitingApprovals,
     pendingTools,
     allHandled,
@@ -53,6 +55,9 @@ export default function Home() {
           </div>
           <div className="flex items-center gap-2">
             <ThemeToggle />
+            <Button asChild variant="outline" size="sm">
+              <Link to="/matrix">Matrix</Link>
+            </Button>
             <Button
               onClick={clearMessages}
               variant="outline"
@@ -73,6 +78,7 @@ export default function Home() {
             messages={messages}
             error={error}
             isLoading={isLoading}
+            queuePosition={queuePosition}
             awaitingApprovals={awaitingApprovals}
             pendingTools={pendingTools}
             allHandled={allHandled}
@@ -0,0 +1,232 @@
+import { useEffect, useState } from 'react';
+import { Link } from 'react-router-dom';
+import type { AgentsResponse, MatrixRun } from '../types/agent';
+import { useMatrix } from '../hooks/useMatrix';
+import type { MatrixRunState } from '../hooks/useMatrix';
+import ThemeToggle from '../components/ThemeToggle';
+import { Alert, AlertDescription } from '@/components/ui/alert';
+import { Button } from '@/components/ui/button';
+import { Input } from '@/components/ui/input';
+import { Label } from '@/components/ui/label';
+import { Textarea } from '@/components/ui/textarea';
+import { AlertCircle, Hourglass, Play, Square } from 'lucide-react';
+
+interface ScenarioOption {
+  agent: string;
+  // Empty for agents exported without scenarios
+  scenario: string;
+}
+
+const optionKey = (option: ScenarioOption) => `${option.agent}/${option.scenario}`;
+
+export default function Matrix() {
+  const baseUrl = window.location.origin;
+  const [options, setOptions] = useState<ScenarioOption[]>([]);
+  const [selected, setSelected] = useState<Set<string>>(new Set());
+  const [prompt, setPrompt] = useState('');
+  const [models, setModels] = useState('');
+  const [loadError, setLoadError] = useState<string | null>(null);
+  const { runs, isLoading, error, wallTimeMs, runMatrix, cancelMatrix } = useMatrix();
+
+  useEffect(() => {
+    const fetchAgents = async () => {
+      try {
+        const response = await fetch(`${baseUrl}/api/agents`);
+        if (!response.ok) {
+          throw new Error(`Failed to fetch agents: ${response.statusText}`);
+        }
+        const data: AgentsResponse = await response.json();
+        setOptions(
+          data.agents
+            .sort((a, b) => a.name.localeCompare(b.name))
+            .flatMap((agent) =>
+              agent.settings.length > 0
+                ? agent.settings.map((s) => ({ agent: agent.name, scenario: s.name }))
+                : [{ agent: agent.name, scenario: '' }]
+            )
+        );
+      } catch (err) {
+        setLoadError(err instanceof Error ? err.message : 'Failed to load agents');
+      }
+    };
+
+    fetchAgents();
+  }, [baseUrl]);
+
+  const toggle = (key: string) => {
+    setSelected((prev) => {
+      const next = new Set(prev);
+      if (next.has(key)) {
+        next.delete(key);
+      } else {
+        next.add(key);
+      }
+      return next;
+    });
+  };
+
+  const handleRun = () => {
+    // Every selected scenario runs with each model, or with its agent's own model
+    const modelOverrides = models
+      .split(',')
+      .map((model) => model.trim())
+      .filter(Boolean);
+    const matrixRuns: MatrixRun[] = options
+      .filter((option) => selected.has(optionKey(option)))
+      .flatMap((option) =>
+        (modelOverrides.length > 0 ? modelOverrides : [undefined]).map((model) => ({
+          agent: option.agent,
+          scenario: option.scenario,
+          model,
+        }))
+      );
+    runMatrix(baseUrl, prompt, matrixRuns);
+  };
+
+  return (
+    <div className="h-screen flex flex-col bg-background">
+      <header className="sticky top-0 z-10 bg-card border-b border-border/50 px-8 py-5 shadow-sm">
+        <div className="flex items-center justify-between max-w-[1800px] mx-auto">
+          <div>
+            <h1 className="text-2xl font-bold bg-gradient-to-r from-primary via-purple-500 to-violet-500 bg-clip-text text-transparent">
+              Scenario Matrix
+            </h1>
+            <p className="text-sm text-muted-foreground mt-0.5">
+              One prompt against many scenarios and models, side by side
+            </p>
+          </div>
+          <div className="flex items-center gap-2">
+            <ThemeToggle />
+            <Button asChild variant="outline" size="sm">
+              <Link to="/">Playground</Link>
+            </Button>
+          </div>
+        </div>
+      </header>
+
+      <div className="flex-1 flex overflow-hidden">
+        <aside className="w-80 border-r border-border/50 p-6 space-y-6 overflow-y-auto">
+          <div className="space-y-2">
+            <Label>Scenarios</Label>
+            {loadError && <p className="text-sm text-destructive">{loadError}</p>}
+            {options.map((option) => {
+              const key = optionKey(option);
+              return (
+                <label key={key} className="flex items-center gap-2 text-sm cursor-pointer">
+                  <input
+                    type="checkbox"
+                    checked={selected.has(key)}
+                    onChange={() => toggle(key)}
+                  />
+                  <span className="font-medium">{option.agent}</span>
+                  {option.scenario && (
+                    <span className="text-muted-foreground">{option.scenario}</span>
+                  )}
+                </label>
+              );
+            })}
+          </div>
+
+          <div className="space-y-2">
+            <Label htmlFor="matrix-models">Models</Label>
+            <Input
+              id="matrix-models"
+              placeholder="Agent's own model"
+              value={models}
+              onChange={(e) => setModels(e.target.value)}
+            />
+            <p className="text-xs text-muted-foreground">
+              Comma-separated, e.g. openai:gpt-4o, ollama:qwen3
+            </p>
+          </div>
+
+          <div className="space-y-2">
+            <Label htmlFor="matrix-prompt">Prompt</Label>
+            <Textarea
+              id="matrix-prompt"
+              rows={6}
+              value={prompt}
+              onChange={(e) => setPrompt(e.target.value)}
+            />
+          </div>
+
+          {isLoading ? (
+            <Button className="w-full" variant="outline" onClick={cancelMatrix}>
+              <Square size={16} className="mr-2" />
+              Stop
+            </Button>
+          ) : (
+            <Button className="w-full" onClick={handleRun}>
+              <Play size={16} className="mr-2" />
+              Run
+            </Button>
+          )}
+        </aside>
+
+        <main className="flex-1 overflow-y-auto p-6">
+          {error && (
+            <Alert variant="destructive" className="mb-6">
+              <AlertCircle className="h-4 w-4" />
+              <AlertDescription>{error}</AlertDescription>
+            </Alert>
+          )}
+          {wallTimeMs !== null && (
+            <p className="text-sm text-muted-foreground mb-4">
+              {runs.length} runs in {(wallTimeMs / 1000).toFixed(2)}s
+            </p>
+          )}
+          <div className="grid gap-4 grid-cols-[repeat(auto-fill,minmax(360px,1fr))]">
+            {runs.map((run) => (
+              <MatrixRunCard key={run.info.run_id} run={run} />
+            ))}
+          </div>
+        </main>
+      </div>
+    </div>
+  );
+}
+
+function MatrixRunCard({ run }: { run: MatrixRunState }) {
+  const { info, summary } = run;
+  return (
+    <div className="rounded-xl border border-border/50 bg-card p-4 flex flex-col gap-3">
+      <div>
+        <p className="font-semibold">
+          {info.agent}
+          {info.scenario && <span className="text-muted-foreground"> / {info.scenario}</span>}
+        </p>
+        <p className="text-xs text-muted-foreground">{info.model}</p>
+        {run.winner && (
+          <p className="text-xs text-muted-foreground">answered by {run.winner}</p>
+        )}
+      </div>
+
+      {run.queuePosition !== null && (
+        <p className="flex items-center gap-2 text-xs text-muted-foreground">
+          <Hourglass size={12} className="animate-pulse" />
+          Queued, position {run.queuePosition}
+        </p>
+      )}
+      {run.toolCalls.length > 0 && (
+        <p className="text-xs text-muted-foreground">Tools: {run.toolCalls.join(', ')}</p>
+      )}
+      <p className="text-sm whitespace-pre-wrap flex-1">{run.text}</p>
+
+      {summary && (
+        <div className="border-t border-border/50 pt-2 text-xs text-muted-foreground flex flex-wrap gap-x-4 gap-y-1">
+          <span className={summary.status === 'error' ? 'text-destructive' : undefined}>
+            {summary.error ?? summary.status}
+          </span>
+          {summary.first_delta_ms !== null && (
+            <span>first text {summary.first_delta_ms.toFixed(0)} ms</span>
+          )}
+          <span>total {summary.duration_ms.toFixed(0)} ms</span>
+          <span>
+            {summary.input_tokens} in / {summary.output_tokens} out tokens
+          </span>
+          {summary.cost !== null && <span>${summary.cost.toFixed(4)}</span>}
+        </div>
+      )}
+    </div>
+  );
+}
@@ -39,10 +39,18 @@ export interface DeferredToolResults {
 export interface ChatRequest {
   agent: string;
   messages: ModelMessage[];
+  session_id?: string;
+  reset_session?: boolean;
+  // Stored conversation to continue, after message_id (from its start if omitted)
+  conversation_id?: string;
+  message_id?: number;
   settings?: Record<string, unknown>;
   stream?: boolean;
   use_tools?: 'auto' | 'request_approval';
   deferred_tool_results?: DeferredToolResults;
+  // Resumes a run paused for approvals from its server-side checkpoint
+  resume_token?: string;
+  history_mode?: 'full' | 'delta';
 }
 
 // Stream event types matching backend
@@ -86,11 +94,47 @@ export interface ErrorEvent {
 export interface MessageHistoryEvent {
   type: 'message_history';
   message_history: Array<Record<string, unknown>>;
+  // Leading messages the client already has; message_history replaces the rest
+  prefix_length: number;
+}
+
+export interface ConversationSavedEvent {
+  type: 'conversation_saved';
+  conversation_id: string;
+  // Ids of the branch's messages; continuing after an earlier one forks it
+  message_ids: number[];
+}
+
+export interface QueuedEvent {
+  type: 'queued';
+  // 1 when this run is next in the queue of its agent or model
+  position: number;
+}
+
+export interface ModelRaceEvent {
+  type: 'model_race';
+  // Model of a hedged export that answered a request first, e.g. "openai:gpt-4o"
+  winner: string;
+  // 0 when the primary model answered
+  index: number;
+  started: number;
+  first_event_ms: number;
+}
+
+export interface UsageEvent {
+  type: 'usage';
+  input_tokens: number;
+  output_tokens: number;
+  requests: number;
+  tool_calls: number;
+  // In dollars, null unless the server has prices for the models used
+  cost: number | null;
 }
 
 export interface DoneEvent {
   type: 'done';
   status: DoneStatus;
+  resume_token?: string | null;
 }
 
 export type StreamEvent =
@@ -101,6 +145,10 @@ export type StreamEvent =
   | ToolApprovalRequestEvent
   | ErrorEvent
   | MessageHistoryEvent
+  | ConversationSavedEvent
+  | QueuedEvent
+  | ModelRaceEvent
+  | UsageEvent
   | DoneEvent;
 
 // Tool call with result for UI display
@@ -111,3 +159,40 @@ export interface ToolCallWithResult {
   result?: unknown;
   isExecuting?: boolean;
 }
+
+// Scenario matrix: one prompt run against several agents, scenarios and models
+export interface MatrixRun {
+  agent: string;
+  // Omitted to run every scenario of the agent
+  scenario?: string;
+  // Model to run instead of the agent's, e.g. "openai:gpt-4o"
+  model?: string;
+}
+
+export interface MatrixRequest {
+  prompt: string;
+  runs: MatrixRun[];
+}
+
+export interface MatrixRunInfo {
+  run_id: string;
+  agent: string;
+  scenario: string;
+  model: string;
+}
+
+export interface MatrixRunSummary {
+  run_id: string;
+  status: DoneStatus | 'error';
+  error: string | null;
+  first_delta_ms: number | null;
+  duration_ms: number;
+  input_tokens: number;
+  output_tokens: number;
+  cost: number | null;
+}
+
+export type MatrixStreamEvent =
+  | { type: 'matrix_runs'; runs: MatrixRunInfo[] }
+  | { type: 'run_event'; run_id: string; event: StreamEvent }
+  | { type: 'matrix_summary'; runs: MatrixRunSummary[] };
@@ -1,4 +1,31 @@
-import type { ChatRequest, StreamEvent } from '../types/agent';
+import type {
+  ChatRequest,
+  MatrixRequest,
+  MatrixStreamEvent,
+  StreamEvent,
+} from '../types/agent';
+import type { ModelMessage } from '../types/message';
+
+export class ApiError extends Error {
+  status: number;
+
+  constructor(message: string, status: number) {
+    super(message);
+    this.status = status;
+  }
+}
+
+// A server-side conversation session; `synced` is true while the server holds
+// the same history as the client, so only new messages need to be sent.
+export interface ChatSession {
+  id: string;
+  synced: boolean;
+}
+
+export const createChatSession = (): ChatSession => ({
+  id: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`,
+  synced: false,
+});
 
 export const initializeApiClient = (baseUrl: string) => {
   return {
@@ -21,15 +48,41 @@ export const makeStreamingChatRequest = async function* (
   });
 
   if (!response.ok) {
-    throw new Error(`API request failed: ${response.statusText}`);
+    throw new ApiError(`API request failed: ${response.statusText}`, response.status);
   }
 
+  yield* readNdjson<StreamEvent>(response);
+};
+
+export const makeMatrixRequest = async function* (
+  client: ReturnType<typeof initializeApiClient>,
+  request: MatrixRequest
+): AsyncGenerator<MatrixStreamEvent> {
+  const response = await fetch(`${client.baseUrl}/api/matrix`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+    signal: client.abortController.signal,
+  });
+
+  if (!response.ok) {
+    throw new ApiError(`API request failed: ${response.statusText}`, response.status);
+  }
+
+  yield* readNdjson<MatrixStreamEvent>(response);
+};
+
+const readNdjson = async function* <T>(response: Response): AsyncGenerator<T> {
   if (!response.body) {
     throw new Error('Response body is null');
   }
 
   const reader = response.body.getReader();
   const decoder = new TextDecoder();
+  // A line may be split across chunks, keep its start until the rest arrives
+  let buffer = '';
 
   try {
     while (true) {
@@ -37,13 +90,13 @@ export const makeStreamingChatRequest = async function* (
 
       if (done) break;
 
-      const chunk = decoder.decode(value, { stream: true });
-      const lines = chunk.split('\n').filter((line) => line.trim());
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() ?? '';
 
-      for (const line of lines) {
+      for (const line of lines.filter((line) => line.trim())) {
         try {
-          const data = JSON.parse(line) as StreamEvent;
-          yield data;
+          yield JSON.parse(line) as T;
         } catch {
           // Skip invalid JSON lines
         }
@@ -53,3 +106,74 @@ export const makeStreamingChatRequest = async function* (
     reader.releaseLock();
   }
 };
+
+export const makeSessionChatRequest = async function* (
+  client: ReturnType<typeof initializeApiClient>,
+  session: ChatSession,
+  request: ChatRequest,
+  newMessages: ModelMessage[]
+): AsyncGenerator<StreamEvent> {
+  if (session.synced) {
+    session.synced = false;
+    try {
+      yield* trackSession(
+        session,
+        makeStreamingChatRequest(client, {
+          ...request,
+          messages: newMessages,
+          session_id: session.id,
+        })
+      );
+      return;
+    } catch (err) {
+      // The server evicted the session, fall back to sending the full history
+      if (!(err instanceof ApiError && err.status === 404)) throw err;
+    }
+  }
+
+  yield* trackSession(
+    session,
+    makeStreamingChatRequest(client, {
+      ...request,
+      session_id: session.id,
+      reset_session: true,
+    })
+  );
+};
+
+// Resume a run paused for approvals from its server-side checkpoint, sending
+// only the decisions; falls back to the session request if the token expired.
+export const makeResumeChatRequest = async function* (
+  client: ReturnType<typeof initializeApiClient>,
+  session: ChatSession,
+  resumeToken: string,
+  request: ChatRequest
+): AsyncGenerator<StreamEvent> {
+  try {
+    yield* trackSession(
+      session,
+      makeStreamingChatRequest(client, {
+        ...request,
+        messages: [],
+        resume_token: resumeToken,
+      })
+    );
+    return;
+  } catch (err) {
+    if (!(err instanceof ApiError && err.status === 404)) throw err;
+  }
+
+  yield* makeSessionChatRequest(client, session, request, []);
+};
+
+const trackSession = async function* (
+  session: ChatSession,
+  stream: AsyncGenerator<StreamEvent>
+): AsyncGenerator<StreamEvent> {
+  for await (const event of stream) {
+    if (event.type === 'message_history') {
+      session.synced = true;
+    }
+    yield event;
+  }
+};